@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+import zipfile
+from contextlib import nullcontext
+from functools import partial
+
+from vcf_parser import parse_vcf_fileobj
+
+
+VCF_EXTENSIONS = (".vcf", ".vcf.gz", ".vcf.bgz")
+COMPRESSED_EXTENSIONS = (".gz", ".bgz")
+ARCHIVE_EXTENSIONS = (".zip",)
+
+
+# ─────────────────────────────────────────────
+# Batch sources (one per patient VCF)
+# ─────────────────────────────────────────────
+def list_archive_sources(name: str, fileobj):
+    """Return (name, opener) for each VCF inside a zip archive.
+
+    Only the central directory is read here; members are opened by the
+    worker that parses them. zipfile serialises reads of the shared file,
+    so several members can be parsed at once.
+    """
+
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as exc:
+        raise ValueError(f"{name} is not a valid zip archive.") from exc
+
+    return [
+        (f"{name}/{member.filename}", partial(archive.open, member))
+        for member in archive.infolist()
+        if not member.is_dir() and member.filename.endswith(VCF_EXTENSIONS)
+    ]
+
+
+def detach_uploads(uploads):
+    """Copy ``(name, fileobj)`` uploads into temp files owned by the caller.
+
+    FastAPI closes form uploads as soon as the endpoint returns, which is
+    before a streamed response has read them.
+    """
+
+    detached = []
+
+    try:
+        for name, fileobj in uploads:
+            copy = tempfile.TemporaryFile()
+            detached.append((name, copy))
+            fileobj.seek(0)
+            shutil.copyfileobj(fileobj, copy, 1024 * 1024)
+            copy.seek(0)
+    except BaseException:
+        close_uploads(detached)
+        raise
+
+    return detached
+
+
+def close_uploads(uploads):
+    for _, fileobj in uploads:
+        fileobj.close()
+
+
+def list_batch_sources(uploads):
+    """Return (name, opener) for every patient VCF in ``(name, fileobj)`` uploads."""
+
+    sources = []
+
+    for name, fileobj in uploads:
+        if name.endswith(ARCHIVE_EXTENSIONS):
+            sources += list_archive_sources(name, fileobj)
+        elif name.endswith(VCF_EXTENSIONS):
+            # The caller owns the file, so the parser must not close it
+            sources.append((name, partial(nullcontext, fileobj)))
+        else:
+            raise ValueError(f"Unsupported file type in batch: {name}")
+
+    return sources
+
+
+def parse_batch_source(name: str, opener, rules=None):
+    with opener() as fileobj:
+        return parse_vcf_fileobj(
+            fileobj, name.endswith(COMPRESSED_EXTENSIONS), rules=rules
+        )
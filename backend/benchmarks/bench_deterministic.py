@@ -0,0 +1,98 @@
+"""Per-drug latency of the deterministic (rules-only) path.
+
+Times evaluate_panel -- star calling, activity score, phenotype, risk,
+confidence and alternatives -- on an already-parsed VCF, which is all the
+explain=none / explain=deferred modes wait for. Without a path, a
+multi-sample synthetic VCF with calls at every star-defining locus of the
+rule set is generated (see synthetic_vcf.py), so every panel gene is
+exercised:
+
+    python benchmarks/bench_deterministic.py [path.vcf] [--budget-us 1000]
+
+Each drug is timed on its own and the run fails if any drug's median
+exceeds the budget.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analysis import evaluate_panel  # noqa: E402
+from parallel_parse import parse_vcf_path  # noqa: E402
+from rules_store import current_rules  # noqa: E402
+from synthetic_vcf import parse_size, write_synthetic_vcf  # noqa: E402
+
+# Dense enough that every sample carries calls in every panel gene
+SYNTHETIC_SIZE = "256KB"
+SYNTHETIC_SAMPLES = 16
+SYNTHETIC_HIT_DENSITY = 0.05
+
+
+def bench(variant_table, drugs: list, repeat: int, rounds: int):
+    """Return the per-drug time (µs) of each round of ``repeat`` panel runs."""
+
+    evaluate_panel(variant_table, drugs)  # warm the compiled-rule and profile caches
+
+    per_drug = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            evaluate_panel(variant_table, drugs)
+        elapsed = time.perf_counter() - start
+        per_drug.append(elapsed / repeat / (len(drugs) * len(variant_table.samples)) * 1e6)
+
+    return per_drug
+
+
+def synthetic_table():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "panel.vcf")
+        write_synthetic_vcf(
+            path, parse_size(SYNTHETIC_SIZE), SYNTHETIC_SAMPLES, SYNTHETIC_HIT_DENSITY
+        )
+        return parse_vcf_path(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("vcf", nargs="?", help="default: synthetic multi-gene VCF")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=1000.0,
+                        help="fail if any drug's median per-call time exceeds this")
+    args = parser.parse_args()
+
+    variant_table = parse_vcf_path(args.vcf) if args.vcf else synthetic_table()
+    rules = current_rules()
+    drugs = sorted(rules.drug_rules)
+
+    missing = sorted({rules.gene_for_drug(drug) for drug in drugs} - set(variant_table.genes))
+    print(f"{len(drugs)} drugs x {len(variant_table.samples)} samples, "
+          f"{args.rounds} rounds of {args.repeat}")
+    if missing:
+        print(f"note: no calls for {', '.join(missing)}; those drugs only time the *1/*1 path")
+
+    over = 0
+    for drug in drugs:
+        per_drug = bench(variant_table, [drug], args.repeat, args.rounds)
+        median = statistics.median(per_drug)
+        over += median > args.budget_us
+        print(f"{drug:<16} median {median:8.1f} µs  best {min(per_drug):8.1f} µs  "
+              f"worst {max(per_drug):8.1f} µs"
+              f"{'  OVER BUDGET' if median > args.budget_us else ''}")
+
+    per_panel = statistics.median(bench(variant_table, drugs, args.repeat, args.rounds))
+    print(f"{'whole panel':<16} median {per_panel:8.1f} µs per drug "
+          f"(budget {args.budget_us:.0f} µs)")
+
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
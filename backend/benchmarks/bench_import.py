@@ -0,0 +1,81 @@
+"""Cold import time of the API module.
+
+Each round imports the module in a fresh interpreter, as a new worker does
+on boot, and reports wall time plus the slowest imports from -X importtime:
+
+    python benchmarks/bench_import.py [--module main] [--rounds 5] [--top 15]
+
+Runs with LLM_PROVIDER=none and no GROQ_API_KEY unless --env-keep is given,
+so it also checks that the service starts in rules-only mode.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def import_once(module: str, env: dict):
+    """Return (wall seconds, {module: cumulative µs}) for one cold import."""
+
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print(time.perf_counter() - start)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    # stderr lines: "import time: self [us] | cumulative | imported package"
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+
+    return float(proc.stdout.strip().splitlines()[-1]), cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--env-keep", action="store_true",
+                        help="import with the current LLM settings")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.env_keep:
+        env.pop("GROQ_API_KEY", None)
+        env["LLM_PROVIDER"] = "none"
+
+    times = []
+    slowest = {}
+    for _ in range(args.rounds):
+        elapsed, cumulative = import_once(args.module, env)
+        times.append(elapsed)
+        for name, us in cumulative.items():
+            slowest[name] = min(us, slowest.get(name, us))
+
+    print(f"import {args.module}: median {statistics.median(times) * 1000:.1f} ms, "
+          f"best {min(times) * 1000:.1f} ms over {args.rounds} cold starts")
+
+    print("\nslowest imports (best cumulative):")
+    for name, us in sorted(slowest.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
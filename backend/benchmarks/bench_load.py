@@ -0,0 +1,216 @@
+"""Load test for POST /analyze at several concurrency levels.
+
+Sends the same VCF + drug panel from N concurrent keep-alive clients and
+reports latency percentiles, throughput and errors per level:
+
+    python benchmarks/bench_load.py --url http://localhost:8000
+    python benchmarks/bench_load.py --spawn --stub-latency 0.8 --stub-error-rate 0.02
+
+With --spawn a local server is started with the stub LLM provider, rate
+limits off and the explanation cache disabled, so every request pays the
+configured stub latency and the numbers show our own overhead on top of it.
+Against a running server, start it with LLM_PROVIDER=stub and
+RATE_LIMIT_ENABLED=0 yourself.
+"""
+
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_VCF = BACKEND_DIR / "sample_vcf" / "1.vcf"
+
+
+def multipart_body(fields: dict, filename: str, content: bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+
+    for name, value in fields.items():
+        parts.append(
+            f"--{boundary}\r\nContent-Disposition: form-data; "
+            f"name=\"{name}\"\r\n\r\n{value}\r\n".encode()
+        )
+
+    parts.append(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; "
+        f"filename=\"{filename}\"\r\nContent-Type: text/plain\r\n\r\n".encode()
+        + content + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(ordered: list, pct: float):
+    # Nearest-rank on an already sorted list
+    if not ordered:
+        return float("nan")
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+# ─────────────────────────────────────────────
+# Load generation
+# ─────────────────────────────────────────────
+def run_level(url: str, body: bytes, content_type: str,
+              concurrency: int, requests: int, timeout: float):
+    """Return (latencies of 200s, {status: count}, wall seconds) for one level."""
+
+    target = urlsplit(url)
+    path = target.path.rstrip("/") + "/analyze"
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+    latencies, statuses = [], {}
+
+    def client():
+        connection = http.client.HTTPConnection(target.hostname, target.port, timeout=timeout)
+
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+
+            start = time.perf_counter()
+            try:
+                connection.request("POST", path, body, {"Content-Type": content_type})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException) as exc:
+                status = type(exc).__name__
+                connection.close()
+            elapsed = time.perf_counter() - start
+
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+        connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client)
+    wall = time.perf_counter() - start
+
+    return sorted(latencies), statuses, wall
+
+
+# ─────────────────────────────────────────────
+# Local server with the stub provider
+# ─────────────────────────────────────────────
+def spawn_server(args):
+    jobs_dir = tempfile.mkdtemp(prefix="pharmaguard-load-")
+    env = dict(
+        os.environ,
+        LLM_PROVIDER="stub",
+        STUB_LLM_LATENCY=str(args.stub_latency),
+        STUB_LLM_JITTER=str(args.stub_jitter),
+        STUB_LLM_DISTRIBUTION=args.stub_distribution,
+        STUB_LLM_ERROR_RATE=str(args.stub_error_rate),
+        RATE_LIMIT_ENABLED="0",
+        RULES_RELOAD_INTERVAL="0",
+        MECHANISM_CACHE_BACKEND="memory",
+        # No pre-generated store, so every explanation goes to the stub
+        MECHANISM_STORE_PATH=os.path.join(jobs_dir, "no-store.json"),
+        JOBS_DIR=jobs_dir,
+    )
+    if not args.cache:
+        env["MECHANISM_CACHE_MAX_ENTRIES"] = "0"
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            sys.exit("server exited during startup")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", args.port, timeout=1)
+            connection.request("GET", "/status/queues")
+            connection.getresponse().read()
+            connection.close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+
+    server.terminate()
+    sys.exit("server did not start within 30s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None, help="running server (default: --spawn one)")
+    parser.add_argument("--vcf", default=str(DEFAULT_VCF))
+    parser.add_argument("--drugs", default="CLOPIDOGREL,WARFARIN,CODEINE")
+    parser.add_argument("--explain", default="inline", choices=("inline", "deferred", "none"))
+    parser.add_argument("--concurrency", default="1,4,16,64",
+                        help="comma-separated client counts")
+    parser.add_argument("--requests", type=int, default=200, help="requests per level")
+    parser.add_argument("--timeout", type=float, default=60.0)
+
+    spawn = parser.add_argument_group("spawned server")
+    spawn.add_argument("--spawn", action="store_true")
+    spawn.add_argument("--port", type=int, default=8765)
+    spawn.add_argument("--workers", type=int, default=1)
+    spawn.add_argument("--cache", action="store_true",
+                       help="keep the explanation cache on (measures the hit path)")
+    spawn.add_argument("--stub-latency", type=float, default=0.5)
+    spawn.add_argument("--stub-jitter", type=float, default=0.1)
+    spawn.add_argument("--stub-distribution", default="lognormal",
+                       choices=("fixed", "normal", "lognormal"))
+    spawn.add_argument("--stub-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn or args.url is None:
+        server = spawn_server(args)
+        args.url = f"http://127.0.0.1:{args.port}"
+
+    with open(args.vcf, "rb") as handle:
+        body, content_type = multipart_body(
+            {"drugs": args.drugs, "explain": args.explain},
+            Path(args.vcf).name, handle.read()
+        )
+
+    print(f"{args.url}/analyze  explain={args.explain}  drugs={args.drugs}  "
+          f"{args.requests} requests per level")
+    print(f"{'clients':>7} {'ok':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>8}  errors")
+
+    try:
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            latencies, statuses, wall = run_level(
+                args.url, body, content_type, concurrency, args.requests, args.timeout
+            )
+            errors = ", ".join(
+                f"{status}: {count}" for status, count in statuses.items() if status != 200
+            )
+            print(f"{concurrency:>7} {len(latencies):>6} "
+                  f"{percentile(latencies, 50) * 1000:>9.1f} "
+                  f"{percentile(latencies, 95) * 1000:>9.1f} "
+                  f"{percentile(latencies, 99) * 1000:>9.1f} "
+                  f"{len(latencies) / wall:>8.1f}  {errors or '-'}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""End-to-end benchmark suite with stored baselines.
+
+Cases:
+    parse-mmap-<size>     local/CLI path (mmap, process pool when large)
+    parse-stream-<size>   upload path (chunked VCFStreamParser)
+    star                  determine_star per call
+    rules                 evaluate_panel per drug
+    request-<explain>     POST /analyze through FastAPI's TestClient, stub LLM
+
+Parse and request cases run in a fresh interpreter each so peak RSS is
+per case. Inputs are synthetic VCFs (see synthetic_vcf.py), generated once
+into --data-dir and reused:
+
+    python benchmarks/bench_suite.py                       # compare to baselines.json
+    python benchmarks/bench_suite.py --sizes 1KB,1MB,64MB,2GB --samples 16
+    python benchmarks/bench_suite.py --save-baseline --runs 3   # record this machine's numbers
+
+Exits 1 when any metric is worse than its baseline by more than --tolerance.
+Baselines are machine-specific; re-record them on the machine that checks.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from synthetic_vcf import parse_size, write_synthetic_vcf  # noqa: E402
+
+BASELINE_PATH = BENCH_DIR / "baselines.json"
+DEFAULT_DATA_DIR = Path(tempfile.gettempdir()) / "pharmaguard-bench"
+
+# +1: higher is better, -1: lower is better
+METRICS = {
+    "mb_per_s": 1,
+    "variants_per_s": 1,
+    "peak_rss_mb": -1,
+    "us_per_call": -1,
+    "us_per_drug": -1,
+    "p50_ms": -1,
+    "p95_ms": -1,
+}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS; children covers pool workers
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    ) / scale
+
+
+def best_time(func, min_rounds: int = 3, min_time: float = 0.5, max_time: float = 10.0):
+    """Best wall time of repeated calls: at least ``min_rounds`` and ``min_time``
+    in total, but no new round once ``max_time`` is spent (large inputs)."""
+
+    times = []
+    while (len(times) < min_rounds or sum(times) < min_time) and sum(times) < max_time:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def synthetic_input(data_dir: Path, size: str, samples: int, hit_density: float):
+    """Return (path, generator stats), generating the file on first use."""
+
+    name = f"synthetic-{size}-{samples}s-{hit_density:g}"
+    path = data_dir / f"{name}.vcf"
+    stats_path = data_dir / f"{name}.json"
+
+    if not (path.exists() and stats_path.exists()):
+        data_dir.mkdir(parents=True, exist_ok=True)
+        stats = write_synthetic_vcf(str(path), parse_size(size), samples, hit_density)
+        stats_path.write_text(json.dumps(stats))
+
+    return path, json.loads(stats_path.read_text())
+
+
+# ─────────────────────────────────────────────
+# Cases run in a child interpreter
+# ─────────────────────────────────────────────
+def run_parse(spec: dict):
+    from parallel_parse import parse_vcf_path
+    from vcf_parser import parse_vcf_fileobj
+
+    def parse():
+        if spec["mode"] == "mmap":
+            parse_vcf_path(spec["path"])
+        else:
+            with open(spec["path"], "rb") as handle:
+                parse_vcf_fileobj(handle)
+
+    elapsed = best_time(parse)
+
+    return {
+        "mb_per_s": spec["bytes"] / elapsed / 1e6,
+        "variants_per_s": spec["records"] / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_request(spec: dict):
+    jobs_dir = tempfile.mkdtemp(prefix="pharmaguard-bench-jobs-")
+    os.environ.update(
+        LLM_PROVIDER="stub",
+        STUB_LLM_LATENCY="0",
+        RATE_LIMIT_ENABLED="0",
+        RULES_RELOAD_INTERVAL="0",
+        MECHANISM_CACHE_BACKEND="memory",
+        MECHANISM_CACHE_MAX_ENTRIES="0",
+        # No pre-generated store, so every explanation goes to the stub
+        MECHANISM_STORE_PATH=os.path.join(jobs_dir, "no-store.json"),
+        JOBS_DIR=jobs_dir,
+    )
+
+    try:
+        from fastapi.testclient import TestClient
+        import main
+    except ImportError as exc:
+        return {"skipped": f"needs the API dependencies ({exc.name})"}
+
+    with open(spec["path"], "rb") as handle:
+        content = handle.read()
+
+    def post():
+        response = client.post(
+            "/analyze",
+            files={"file": (Path(spec["path"]).name, content, "text/plain")},
+            data={"drugs": spec["drugs"], "explain": spec["explain"]}
+        )
+        response.raise_for_status()
+
+    with TestClient(main.app) as client:
+        post()  # warm-up
+
+        latencies = []
+        for _ in range(spec["repeat"]):
+            start = time.perf_counter()
+            post()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+CHILD_CASES = {"parse": run_parse, "request": run_request}
+
+
+def run_child(spec: dict):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", json.dumps(spec)],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout)
+
+
+# ─────────────────────────────────────────────
+# In-process micro cases
+# ─────────────────────────────────────────────
+def run_star(repeat: int = 2000):
+    from rule_engine import determine_star
+    from rules_store import current_rules
+
+    rules = current_rules()
+    calls = [
+        (gene, [{"rsid": rsid, "zygosity": "Heterozygous"} for rsid in list(star_map)[:2]])
+        for gene, star_map in rules.star_alleles.items()
+    ]
+
+    def call_all():
+        for _ in range(repeat):
+            for gene, variants in calls:
+                determine_star(gene, variants, rules)
+
+    elapsed = best_time(call_all, min_rounds=5)
+
+    return {"us_per_call": elapsed / (repeat * len(calls)) * 1e6}
+
+
+def run_rules(path: Path):
+    from bench_deterministic import bench
+    from parallel_parse import parse_vcf_path
+    from rules_store import current_rules
+
+    variant_table = parse_vcf_path(str(path))
+    drugs = sorted(current_rules().drug_rules)
+
+    return {"us_per_drug": min(bench(variant_table, drugs, 200, 5))}
+
+
+# ─────────────────────────────────────────────
+# Baselines
+# ─────────────────────────────────────────────
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown"
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu": cpu_model(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def baseline_note():
+    from parallel_parse import PARSE_PROCESSES
+
+    pool = (f"{PARSE_PROCESSES} processes" if PARSE_PROCESSES > 1
+            else "a single process (no pool)")
+    return (f"Recorded on {os.cpu_count()} CPU(s): parse-mmap cases at or above "
+            f"PARALLEL_PARSE_MIN_BYTES ran on {pool}. request-* cases use the "
+            f"stub LLM with zero latency, so they measure server overhead only.")
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Yield (case, metric, value, baseline value, change, regressed)."""
+
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            if metric not in METRICS:
+                continue
+
+            reference = baseline.get(case, {}).get(metric)
+            if not reference:
+                yield case, metric, value, None, None, False
+                continue
+
+            change = (value - reference) / reference
+            regressed = METRICS[metric] * change < -tolerance
+            yield case, metric, value, reference, change, regressed
+
+
+def run_suite(args):
+    data_dir = Path(args.data_dir)
+    results = {}
+
+    for size in args.sizes.split(","):
+        path, stats = synthetic_input(data_dir, size, args.samples, args.hit_density)
+        for mode in ("mmap", "stream"):
+            results[f"parse-{mode}-{size}"] = run_child({
+                "case": "parse", "mode": mode, "path": str(path), **stats
+            })
+
+    results["star"] = run_star()
+
+    # Rule and request cases need PGx hits, so use a dense 1MB input
+    path, _ = synthetic_input(data_dir, "1MB", args.samples, 0.002)
+    results["rules"] = run_rules(path)
+
+    from rules_store import current_rules
+    drugs = ",".join(sorted(current_rules().drug_rules))
+    for explain in ("none", "inline"):
+        results[f"request-{explain}"] = run_child({
+            "case": "request", "path": str(path), "drugs": drugs,
+            "explain": explain, "repeat": args.repeat
+        })
+
+    return results
+
+
+def merge_best(best: dict, metrics: dict):
+    if best is None:
+        return metrics
+
+    merged = dict(best)
+    for metric, value in metrics.items():
+        if metric in METRICS and metric in best:
+            merged[metric] = max(best[metric], value, key=lambda v: METRICS[metric] * v)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1KB,1MB,64MB")
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--hit-density", type=float, default=0.001)
+    parser.add_argument("--data-dir", default=str(DEFAULT_DATA_DIR))
+    parser.add_argument("--repeat", type=int, default=30, help="requests per request case")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="repeat the suite and keep each metric's best value")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed relative slowdown before failing")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        spec = json.loads(args.child)
+        print(json.dumps(CHILD_CASES[spec["case"]](spec)))
+        return 0
+
+    # Best value per metric across runs damps noise from shared machines
+    results = {}
+    for _ in range(args.runs):
+        for case, metrics in run_suite(args).items():
+            results[case] = merge_best(results.get(case), metrics)
+
+    baseline = {}
+    if Path(args.baseline).exists():
+        stored = json.loads(Path(args.baseline).read_text())
+        baseline = stored["cases"]
+        if stored.get("machine") != machine_info():
+            print(f"note: baseline was recorded on {stored.get('machine')}\n")
+
+    regressions = 0
+    print(f"{'case':<24} {'metric':<15} {'value':>14} {'baseline':>14} {'change':>8}")
+
+    for case, metrics in results.items():
+        for reason in ("skipped", "error"):
+            if reason in metrics:
+                print(f"{case:<24} {reason}: {metrics[reason]}")
+
+    for case, metric, value, reference, change, regressed in compare(
+        results, baseline, args.tolerance
+    ):
+        regressions += regressed
+        print(f"{case:<24} {metric:<15} {value:>14,.1f} "
+              f"{'-' if reference is None else f'{reference:,.1f}':>14} "
+              f"{'' if change is None else f'{change:+.0%}':>8}"
+              f"{'  REGRESSION' if regressed else ''}")
+
+    if args.save_baseline:
+        cases = {
+            case: {metric: round(value, 3) for metric, value in metrics.items()
+                   if metric in METRICS}
+            for case, metrics in results.items()
+        }
+        Path(args.baseline).write_text(json.dumps(
+            {"machine": machine_info(), "note": baseline_note(),
+             "cases": {k: v for k, v in cases.items() if v}},
+            indent=2
+        ) + "\n")
+        print(f"\nbaseline saved to {args.baseline}")
+        return 0
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
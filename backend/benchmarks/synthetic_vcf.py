@@ -0,0 +1,181 @@
+"""Synthetic VCF generator for benchmarks.
+
+Writes background SNVs at random positions with PGx target records from the
+active rule set (star-allele rsIDs at their ``variant_loci`` positions,
+annotated with GENE/STAR/RS) mixed in at a given density, until the file reaches the requested size:
+
+    python benchmarks/synthetic_vcf.py out.vcf --size 1GB --samples 16 --hit-density 0.001
+    python benchmarks/synthetic_vcf.py out.vcf.gz --size 50MB
+
+Records are not position-sorted, so outputs are not suitable for tabix.
+"""
+
+import argparse
+import gzip
+import random
+import re
+import sys
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rules_store import current_rules  # noqa: E402
+
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+# Background calls are mostly reference; target calls carry more alt alleles
+# so star calling sees heterozygous and homozygous carriers
+BACKGROUND_GENOTYPES = ("0/0",) * 6 + ("0/1", "0/1", "1/1", "./.")
+TARGET_GENOTYPES = ("0/0", "0/0", "0/1", "0/1", "0|1", "1/1")
+BASES = "ACGT"
+
+# Distinct prefixes/suffixes to pair, and records generated per write
+POOL_SIZE = 4096
+BATCH_RECORDS = 8192
+
+
+def parse_size(text: str) -> int:
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?B?)\s*", text.upper())
+    if not match:
+        raise ValueError(f"Invalid size {text!r}; use e.g. 512KB, 10MB, 2GB.")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def target_records(rules=None):
+    """Return (chrom, pos, rsid, info) for every star-defining locus in the rule set."""
+
+    rules = rules or current_rules()
+    records = []
+
+    for gene, star_map in rules.star_alleles.items():
+        loci = rules.variant_loci.get(gene, {})
+        for rsid in star_map:
+            if rsid in loci:
+                chrom, pos = loci[rsid]
+                # Annotated like the sample VCFs, which is how genes are attributed
+                info = f"GENE={gene};STAR={star_map[rsid]};RS={rsid}"
+                records.append((chrom, pos, rsid, info))
+
+    return sorted(records)
+
+
+def background_pools(rng: random.Random, samples: int, targets: list):
+    """Record prefixes and genotype suffixes, combined at random per line.
+
+    Formatting every line individually caps generation at a few MB/s;
+    pairing pooled halves keeps multi-GB files practical while giving
+    millions of distinct records.
+    """
+
+    target_rsids = {record[2] for record in targets}
+    prefixes = []
+
+    while len(prefixes) < POOL_SIZE:
+        rsid = f"rs{rng.randint(10_000_000, 999_999_999)}"
+        if rsid in target_rsids:
+            continue
+
+        ref, alt = rng.sample(BASES, 2)
+        prefixes.append(
+            f"{rng.randint(1, 22)}\t{rng.randint(1, 248_000_000)}\t"
+            f"{rsid}\t{ref}\t{alt}\t50\tPASS\tDP=30\tGT\t"
+        )
+
+    suffixes = [
+        "\t".join(rng.choices(BACKGROUND_GENOTYPES, k=samples)) + "\n"
+        for _ in range(POOL_SIZE)
+    ]
+
+    return prefixes, suffixes
+
+
+def target_line(rng: random.Random, targets: list, samples: int):
+    chrom, pos, rsid, info = rng.choice(targets)
+    ref, alt = rng.sample(BASES, 2)
+    return (
+        f"{chrom}\t{pos}\t{rsid}\t{ref}\t{alt}\t50\tPASS\t{info}\tGT\t"
+        + "\t".join(rng.choices(TARGET_GENOTYPES, k=samples)) + "\n"
+    )
+
+
+def write_synthetic_vcf(path: str, size: int, samples: int = 1,
+                        hit_density: float = 0.001, seed: int = 0, rules=None):
+    """Write a VCF of at least ``size`` bytes; return its record counts.
+
+    ``hit_density`` is the fraction of records that are PGx targets. Sizes
+    are measured before compression for ``.gz`` paths.
+    """
+
+    rng = random.Random(seed)
+    targets = target_records(rules)
+    if not targets and hit_density > 0:
+        raise ValueError("Rule set has no star-allele loci to place.")
+
+    prefixes, suffixes = background_pools(rng, samples, targets)
+
+    opener = gzip.open if str(path).endswith(".gz") else open
+    sample_names = "\t".join(f"SAMPLE_{i:04d}" for i in range(samples))
+
+    header = (
+        "##fileformat=VCFv4.2\n"
+        "##source=pharmaguard-synthetic\n"
+        '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n'
+        f"#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{sample_names}\n"
+    )
+
+    written = len(header)
+    records = hits = 0
+
+    with opener(path, "wt", encoding="ascii") as handle:
+        handle.write(header)
+
+        while written < size:
+            lines = list(map(
+                str.__add__,
+                rng.choices(prefixes, k=BATCH_RECORDS),
+                rng.choices(suffixes, k=BATCH_RECORDS)
+            ))
+
+            placed = [i for i in range(BATCH_RECORDS) if rng.random() < hit_density]
+            for i in placed:
+                lines[i] = target_line(rng, targets, samples)
+
+            # Stop at the first line that reaches the requested size
+            ends = list(accumulate(map(len, lines), initial=written))
+            if ends[-1] >= size:
+                lines = lines[:bisect_left(ends, size)]
+
+            hits += sum(1 for i in placed if i < len(lines))
+            records += len(lines)
+            written += sum(map(len, lines))
+            handle.write("".join(lines))
+
+    return {"bytes": written, "records": records, "pgx_hits": hits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--size", default="1MB", help="e.g. 1KB, 10MB, 2GB")
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--hit-density", type=float, default=0.001,
+                        help="fraction of records at PGx target loci")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        stats = write_synthetic_vcf(
+            args.path, parse_size(args.size), args.samples, args.hit_density, args.seed
+        )
+    except ValueError as exc:
+        sys.exit(str(exc))
+
+    print(f"{args.path}: {stats['bytes']:,} bytes, {stats['records']:,} records, "
+          f"{stats['pgx_hits']:,} PGx hits")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
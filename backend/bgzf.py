@@ -0,0 +1,437 @@
+import gzip
+import struct
+import zlib
+
+
+# ─────────────────────────────────────────────
+# Streaming gzip / BGZF decoding
+# ─────────────────────────────────────────────
+# Most bytes one inflate step may produce, so a small compressed chunk cannot
+# expand into an unbounded buffer (a gzip bomb)
+MAX_INFLATE_SIZE = 1024 * 1024
+
+
+class GzipStreamDecoder:
+    """Incremental decoder for gzip data made of one or more members.
+
+    BGZF files are a series of small gzip members, so plain
+    ``zlib.decompressobj`` would stop after the first 64KB block.
+    Output is yielded in pieces of at most ``max_length`` bytes, and
+    ``close()`` rejects a stream that stops inside a member.
+    """
+
+    def __init__(self, max_length: int = MAX_INFLATE_SIZE):
+        self.max_length = max_length
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._in_member = False
+
+    def decompress(self, data: bytes):
+        # zlib may still hold output when a piece fills max_length
+        pending = False
+
+        while data or pending:
+            if data:
+                self._in_member = True
+
+            piece = self._decoder.decompress(data, self.max_length)
+            pending = len(piece) == self.max_length
+            if piece:
+                yield piece
+
+            if self._decoder.eof:
+                data = self._decoder.unused_data
+                self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                self._in_member = False
+                pending = False
+            else:
+                data = self._decoder.unconsumed_tail
+
+    def close(self):
+        if self._in_member:
+            raise ValueError("Compressed VCF is truncated: the gzip stream never ends.")
+
+
+def is_gzip(data: bytes) -> bool:
+    return data[:2] == b"\x1f\x8b"
+
+
+# ─────────────────────────────────────────────
+# BGZF blocks
+# ─────────────────────────────────────────────
+BGZF_MAX_BLOCK = 0xFF00
+
+
+def read_block(fileobj):
+    header = fileobj.read(12)
+    if len(header) < 12:
+        return None
+
+    if not is_gzip(header):
+        raise ValueError("Not a BGZF file.")
+
+    xlen = struct.unpack("<H", header[10:12])[0]
+    extra = fileobj.read(xlen)
+
+    block_size = None
+    offset = 0
+    while offset + 4 <= len(extra):
+        si1, si2, slen = struct.unpack("<BBH", extra[offset:offset + 4])
+        if si1 == 66 and si2 == 67:
+            block_size = struct.unpack("<H", extra[offset + 4:offset + 6])[0] + 1
+        offset += 4 + slen
+
+    if block_size is None:
+        raise ValueError("gzip block has no BGZF size field; recompress with bgzip.")
+
+    body = fileobj.read(block_size - 12 - xlen)
+    data = zlib.decompress(header + extra + body, 16 + zlib.MAX_WBITS)
+
+    return block_size, data
+
+
+def bgzf_compress(data: bytes) -> bytes:
+    blocks = []
+
+    for start in range(0, len(data), BGZF_MAX_BLOCK):
+        blocks.append(_compress_block(data[start:start + BGZF_MAX_BLOCK]))
+
+    # Empty block marks end-of-file
+    blocks.append(_compress_block(b""))
+
+    return b"".join(blocks)
+
+
+def _compress_block(data: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = compressor.compress(data) + compressor.flush()
+    block_size = 18 + len(deflated) + 8
+
+    return (
+        struct.pack("<BBBBIBBH", 31, 139, 8, 4, 0, 0, 255, 6)
+        + struct.pack("<BBHH", 66, 67, 2, block_size - 1)
+        + deflated
+        + struct.pack("<II", zlib.crc32(data), len(data))
+    )
+
+
+# ─────────────────────────────────────────────
+# Tabix (.tbi) / CSI (.csi) indexes
+# ─────────────────────────────────────────────
+TBI_MIN_SHIFT = 14
+TBI_DEPTH = 5
+
+
+def reg2bin(beg: int, end: int, min_shift: int = TBI_MIN_SHIFT, depth: int = TBI_DEPTH):
+    end -= 1
+    shift = min_shift
+    offset = ((1 << depth * 3) - 1) // 7
+
+    for level in range(depth, 0, -1):
+        if beg >> shift == end >> shift:
+            return offset + (beg >> shift)
+        shift += 3
+        offset -= 1 << (level - 1) * 3
+
+    return 0
+
+
+def reg2bins(beg: int, end: int, min_shift: int = TBI_MIN_SHIFT, depth: int = TBI_DEPTH):
+    bins = []
+    end -= 1
+    shift = min_shift + depth * 3
+    offset = 0
+
+    for level in range(depth + 1):
+        bins.extend(range(offset + (beg >> shift), offset + (end >> shift) + 1))
+        shift -= 3
+        offset += 1 << level * 3
+
+    return bins
+
+
+class TabixIndex:
+
+    def __init__(self, names, refs, min_shift=TBI_MIN_SHIFT, depth=TBI_DEPTH):
+        # refs[i] = (bins: {bin: [(beg_voffset, end_voffset), ...]}, linear offsets)
+        self.names = names
+        self.refs = refs
+        self.min_shift = min_shift
+        self.depth = depth
+
+    def ref_id(self, chrom: str):
+        for candidate in (chrom, "chr" + chrom, chrom[3:] if chrom.startswith("chr") else None):
+            if candidate in self.names:
+                return self.names.index(candidate)
+        return None
+
+    def chunks(self, chrom: str, beg: int, end: int):
+        tid = self.ref_id(chrom)
+        if tid is None:
+            return []
+
+        bins, linear = self.refs[tid]
+
+        min_offset = 0
+        if linear:
+            min_offset = linear[min(beg >> self.min_shift, len(linear) - 1)]
+
+        return [
+            chunk
+            for bin_id in reg2bins(beg, end, self.min_shift, self.depth)
+            for chunk in bins.get(bin_id, [])
+            if chunk[1] > min_offset
+        ]
+
+    def to_tbi(self) -> bytes:
+        names = b"".join(name.encode() + b"\0" for name in self.names)
+        out = [
+            b"TBI\1",
+            # n_ref, format (VCF), col_seq, col_beg, col_end, meta ('#'), skip, l_nm
+            struct.pack("<8i", len(self.refs), 2, 1, 2, 0, ord("#"), 0, len(names)),
+            names,
+        ]
+
+        for bins, linear in self.refs:
+            out.append(struct.pack("<i", len(bins)))
+            for bin_id, chunks in sorted(bins.items()):
+                out.append(struct.pack("<Ii", bin_id, len(chunks)))
+                for beg, end in chunks:
+                    out.append(struct.pack("<QQ", beg, end))
+            out.append(struct.pack("<i", len(linear)))
+            out.append(struct.pack(f"<{len(linear)}Q", *linear))
+
+        return bgzf_compress(b"".join(out))
+
+
+def read_index(data: bytes) -> TabixIndex:
+    if is_gzip(data):
+        data = gzip.decompress(data)
+
+    magic = data[:4]
+
+    try:
+        if magic == b"TBI\1":
+            return _read_tbi(data)
+
+        if magic == b"CSI\1":
+            return _read_csi(data)
+    except struct.error as exc:
+        raise ValueError("Truncated or corrupt index file.") from exc
+
+    raise ValueError("Unrecognised index format; expected .tbi or .csi.")
+
+
+class _Reader:
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def unpack(self, fmt: str):
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def read(self, size: int) -> bytes:
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+
+def _parse_names(raw: bytes):
+    return [name.decode() for name in raw.split(b"\0") if name]
+
+
+def _read_tbi(data: bytes) -> TabixIndex:
+    reader = _Reader(data, 4)
+    n_ref, _, _, _, _, _, _, l_nm = reader.unpack("<8i")
+    names = _parse_names(reader.read(l_nm))
+
+    pseudo_bin = ((1 << (3 * TBI_DEPTH + 3)) - 1) // 7 + 1
+    refs = []
+
+    for _ in range(n_ref):
+        bins = {}
+        for _ in range(reader.unpack("<i")[0]):
+            bin_id, n_chunk = reader.unpack("<Ii")
+            chunks = [reader.unpack("<QQ") for _ in range(n_chunk)]
+            if bin_id != pseudo_bin:
+                bins[bin_id] = chunks
+
+        n_intv = reader.unpack("<i")[0]
+        linear = list(reader.unpack(f"<{n_intv}Q")) if n_intv else []
+        refs.append((bins, linear))
+
+    return TabixIndex(names, refs)
+
+
+def _read_csi(data: bytes) -> TabixIndex:
+    reader = _Reader(data, 4)
+    min_shift, depth, l_aux = reader.unpack("<3i")
+    aux = reader.read(l_aux)
+
+    # bcftools-style CSI for VCF carries the tabix header in the aux block
+    names = _parse_names(aux[28:]) if len(aux) >= 28 else []
+
+    pseudo_bin = ((1 << (3 * depth + 3)) - 1) // 7 + 1
+    refs = []
+
+    for _ in range(reader.unpack("<i")[0]):
+        bins = {}
+        for _ in range(reader.unpack("<i")[0]):
+            bin_id, _, n_chunk = reader.unpack("<IQi")
+            chunks = [reader.unpack("<QQ") for _ in range(n_chunk)]
+            if bin_id != pseudo_bin:
+                bins[bin_id] = chunks
+        refs.append((bins, []))
+
+    return TabixIndex(names, refs, min_shift, depth)
+
+
+def build_index(fileobj) -> TabixIndex:
+    """Index a bgzipped VCF in one sequential pass (equivalent to ``tabix -p vcf``)."""
+
+    names = []
+    refs = []
+    pending = b""
+    pending_start = 0
+    coffset = 0
+
+    fileobj.seek(0)
+
+    while True:
+        block = read_block(fileobj)
+        if block is None:
+            break
+
+        block_size, data = block
+        line_start = 0
+
+        while True:
+            newline = data.find(b"\n", line_start)
+            if newline == -1:
+                break
+
+            line = pending + data[line_start:newline]
+            start = pending_start if pending else (coffset << 16) | line_start
+            end = (coffset << 16) | (newline + 1)
+            pending = b""
+
+            _index_line(line, start, end, names, refs)
+            line_start = newline + 1
+
+        if line_start < len(data):
+            if not pending:
+                pending_start = (coffset << 16) | line_start
+            pending += data[line_start:]
+
+        coffset += block_size
+
+    if pending:
+        _index_line(pending, pending_start, coffset << 16, names, refs)
+
+    for _, linear in refs:
+        for i in range(1, len(linear)):
+            if linear[i] == 0:
+                linear[i] = linear[i - 1]
+
+    return TabixIndex(names, refs)
+
+
+def _index_line(line: bytes, start: int, end: int, names: list, refs: list):
+    if not line.strip() or line.startswith(b"#"):
+        return
+
+    columns = line.split(None, 4)
+    chrom = columns[0].decode()
+    beg = int(columns[1]) - 1
+    stop = beg + max(len(columns[3]), 1)
+
+    if not names or names[-1] != chrom:
+        names.append(chrom)
+        refs.append(({}, []))
+
+    bins, linear = refs[-1]
+
+    chunks = bins.setdefault(reg2bin(beg, stop), [])
+    if chunks and chunks[-1][1] == start:
+        chunks[-1] = (chunks[-1][0], end)
+    else:
+        chunks.append((start, end))
+
+    last_window = (stop - 1) >> TBI_MIN_SHIFT
+    if len(linear) <= last_window:
+        linear.extend([0] * (last_window + 1 - len(linear)))
+    for window in range(beg >> TBI_MIN_SHIFT, last_window + 1):
+        if linear[window] == 0:
+            linear[window] = start
+
+
+# ─────────────────────────────────────────────
+# Region fetch
+# ─────────────────────────────────────────────
+def read_header(fileobj) -> bytes:
+    fileobj.seek(0)
+    buffered = b""
+
+    while True:
+        block = read_block(fileobj)
+        if block is None:
+            break
+
+        buffered += block[1]
+        lines = buffered.split(b"\n")
+
+        for i, line in enumerate(lines[:-1]):
+            if not line.startswith(b"#"):
+                return b"\n".join(lines[:i]) + b"\n"
+
+    return buffered
+
+
+def _read_span(fileobj, start: int, end: int) -> bytes:
+    cstart, ustart = start >> 16, start & 0xFFFF
+    cend, uend = end >> 16, end & 0xFFFF
+
+    fileobj.seek(cstart)
+    coffset = cstart
+    parts = []
+
+    while coffset <= cend:
+        block = read_block(fileobj)
+        if block is None:
+            break
+
+        block_size, data = block
+        lo = ustart if coffset == cstart else 0
+        hi = uend if coffset == cend else len(data)
+        parts.append(data[lo:hi])
+        coffset += block_size
+
+    return b"".join(parts)
+
+
+def iter_regions(fileobj, index: TabixIndex, regions):
+    """Yield the VCF header followed by the records overlapping ``regions``.
+
+    ``regions`` are (chrom, beg, end) with 0-based half-open coordinates.
+    Chunks from all regions are merged first so each record is read once.
+    """
+
+    yield read_header(fileobj)
+
+    chunks = sorted(
+        chunk
+        for chrom, beg, end in regions
+        for chunk in index.chunks(chrom, beg, end)
+    )
+
+    merged = []
+    for beg, end in chunks:
+        if merged and beg <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((beg, end))
+
+    for beg, end in merged:
+        yield _read_span(fileobj, beg, end)
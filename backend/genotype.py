@@ -0,0 +1,81 @@
+from array import array
+from enum import IntEnum
+from typing import NamedTuple
+
+
+# ─────────────────────────────────────────────
+# Genotype Decoding
+# ─────────────────────────────────────────────
+MISSING_ALLELE = -1
+
+
+class Zygosity(IntEnum):
+    UNKNOWN = 0
+    HOM_REF = 1
+    HETEROZYGOUS = 2
+    HOM_ALT = 3
+
+
+ZYGOSITY_LABELS = {
+    Zygosity.UNKNOWN: "Unknown",
+    Zygosity.HOM_REF: "Homozygous Reference",
+    Zygosity.HETEROZYGOUS: "Heterozygous",
+    Zygosity.HOM_ALT: "Homozygous",
+}
+
+
+class DecodedGenotypes(NamedTuple):
+    allele1: array      # integer allele codes, MISSING_ALLELE for "."
+    allele2: array
+    phased: array       # 1 where the GT used "|"
+    zygosity: array     # Zygosity codes
+
+
+def decode_genotype(genotype: str):
+    """Decode one GT value into (allele1, allele2, phased, zygosity)."""
+
+    if not genotype:
+        return MISSING_ALLELE, MISSING_ALLELE, False, Zygosity.UNKNOWN
+
+    # Remove extra FORMAT info if present (e.g. GT:DP:GQ)
+    genotype = genotype.split(":")[0]
+
+    phased = "|" in genotype
+    alleles = genotype.replace("|", "/").split("/")
+    codes = [int(a) if a.isdigit() else MISSING_ALLELE for a in alleles[:2]]
+
+    # Missing or haploid genotype
+    if "." in alleles or len(codes) < 2:
+        codes.extend([MISSING_ALLELE] * (2 - len(codes)))
+        return codes[0], codes[1], phased, Zygosity.UNKNOWN
+
+    if alleles[0] != alleles[1]:
+        zygosity = Zygosity.HETEROZYGOUS
+    elif alleles[0] == "0":
+        zygosity = Zygosity.HOM_REF
+    else:
+        zygosity = Zygosity.HOM_ALT
+
+    return codes[0], codes[1], phased, zygosity
+
+
+def decode_genotypes(genotypes) -> DecodedGenotypes:
+    """Decode a whole column of GT strings in one pass.
+
+    Each distinct GT string is decoded once; the column is then mapped
+    through the per-string results into compact arrays.
+    """
+
+    distinct = {}
+    for genotype in genotypes:
+        if genotype not in distinct:
+            distinct[genotype] = decode_genotype(genotype)
+
+    decoded = [distinct[genotype] for genotype in genotypes]
+
+    return DecodedGenotypes(
+        array("h", [d[0] for d in decoded]),
+        array("h", [d[1] for d in decoded]),
+        array("B", [d[2] for d in decoded]),
+        array("B", [d[3] for d in decoded]),
+    )
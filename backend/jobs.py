@@ -0,0 +1,330 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from functools import partial
+from pathlib import Path
+
+from batch import COMPRESSED_EXTENSIONS, parse_batch_source
+from bgzf import read_index
+from parallel_parse import parse_vcf_path_parallel, use_parallel_parse
+from vcf_parser import parse_indexed_vcf
+
+try:
+    import fcntl
+except ImportError:  # Windows: claims always succeed, run a single worker process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────
+JOBS_DIR = os.getenv("JOBS_DIR", str(Path(__file__).parent / "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Finished jobs (and their results) are kept this long
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+
+# Seconds between sweeps that prune expired jobs and pick up unclaimed ones
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "60"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+# ─────────────────────────────────────────────
+# On-disk job records
+# ─────────────────────────────────────────────
+class JobStore:
+    """Job status, inputs and results persisted under ``root``.
+
+    Per job:
+        <id>.json          status record (small, rewritten on each transition)
+        <id>.result.json   analysis response, once done
+        <id>.vcf           uploaded file, removed once finished
+        <id>.index         optional tabix/CSI index, removed once finished
+        <id>.lock          flock held by the worker process running the job
+
+    Records are always read from disk, since any process sharing the
+    directory may run a job. ``jobs`` holds only the jobs this process is
+    running.
+    """
+
+    def __init__(self, root: str = JOBS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.jobs = {}
+        self._events = {}
+
+    def _path(self, job_id: str, suffix: str):
+        return self.root / f"{job_id}{suffix}"
+
+    def _write_json(self, path: Path, data):
+        # Write-then-rename so a crash never leaves a truncated record
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(data, handle)
+        os.replace(tmp_path, path)
+
+    def _save(self, job: dict):
+        self._write_json(self._path(job["job_id"], ".json"), job)
+
+    def create(self, filename: str, drugs: str, fileobj, index_fileobj=None,
+               index_filename: str = None):
+        job_id = uuid.uuid4().hex
+
+        with open(self._path(job_id, ".vcf"), "wb") as handle:
+            shutil.copyfileobj(fileobj, handle, 1024 * 1024)
+
+        if index_fileobj is not None:
+            with open(self._path(job_id, ".index"), "wb") as handle:
+                shutil.copyfileobj(index_fileobj, handle)
+
+        job = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "file": filename,
+            "index": index_filename,
+            "drugs": drugs,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
+        self._save(job)
+        return job
+
+    def get(self, job_id: str):
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+
+        try:
+            with open(self._path(job_id, ".json"), encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def claim(self, job_id: str):
+        """Lock a job for this process; return the lock, or None if it is taken.
+
+        The OS drops the lock when its holder exits, so jobs of a crashed
+        worker become claimable again without any cleanup.
+        """
+
+        lock = open(self._path(job_id, ".lock"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return None
+        return lock
+
+    def release(self, lock):
+        # Closing the file releases the flock
+        lock.close()
+
+    def mark_running(self, job: dict):
+        job.update(status=RUNNING, started_at=time.time())
+        self.jobs[job["job_id"]] = job
+        self._save(job)
+
+    def save_result(self, job: dict, result: dict):
+        self._write_json(self._path(job["job_id"], ".result.json"), result)
+
+    def mark_done(self, job: dict):
+        self._finish(job, DONE)
+
+    def mark_failed(self, job: dict, error: str):
+        self._finish(job, FAILED, error)
+
+    def _finish(self, job: dict, status: str, error: str = None):
+        job.update(status=status, finished_at=time.time(), error=error)
+        self._save(job)
+        self._discard_inputs(job["job_id"])
+        self.jobs.pop(job["job_id"], None)
+
+        event = self._events.pop(job["job_id"], None)
+        if event is not None:
+            event.set()
+
+    def _discard_inputs(self, job_id: str):
+        for suffix in (".vcf", ".index"):
+            self._path(job_id, suffix).unlink(missing_ok=True)
+
+    def result(self, job_id: str):
+        with open(self._path(job_id, ".result.json"), encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def input_paths(self, job: dict):
+        index_path = self._path(job["job_id"], ".index") if job["index"] else None
+        return self._path(job["job_id"], ".vcf"), index_path
+
+    async def wait(self, job_id: str, timeout: float):
+        """Long-poll: return once the job has finished or ``timeout`` elapses."""
+
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED or timeout <= 0:
+            return job
+
+        # Only jobs run by this process wake early; others are re-read at the end
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            if job_id not in self.jobs:
+                self._events.pop(job_id, None)
+
+        return self.get(job_id)
+
+    def sweep(self):
+        """Prune expired jobs; return unfinished ones, oldest first.
+
+        Unfinished jobs include ones other processes are running; those
+        are skipped when their claim fails.
+        """
+
+        pending = []
+        now = time.time()
+
+        for path in self.root.glob("*.json"):
+            if path.name.endswith(".result.json"):
+                continue
+
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    job = json.load(handle)
+            except FileNotFoundError:
+                continue  # pruned by another process
+
+            if job["status"] not in FINISHED:
+                pending.append(job)
+            elif now - job["finished_at"] > JOB_RETENTION:
+                self.delete(job["job_id"])
+
+        pending.sort(key=lambda job: job["created_at"])
+        return pending
+
+    def delete(self, job_id: str):
+        self.jobs.pop(job_id, None)
+        for suffix in (".json", ".result.json", ".vcf", ".index", ".lock"):
+            self._path(job_id, suffix).unlink(missing_ok=True)
+
+
+# ─────────────────────────────────────────────
+# Job input parsing
+# ─────────────────────────────────────────────
+def parse_job_input(vcf_path: Path, index_path: Path, filename: str, rules=None):
+
+    if index_path is None:
+        if not filename.endswith(COMPRESSED_EXTENSIONS) and use_parallel_parse(
+            os.path.getsize(vcf_path)
+        ):
+            return parse_vcf_path_parallel(str(vcf_path), rules)
+
+        return parse_batch_source(filename, partial(open, vcf_path, "rb"), rules)
+
+    with open(index_path, "rb") as handle:
+        index = read_index(handle.read())
+
+    with open(vcf_path, "rb") as handle:
+        return parse_indexed_vcf(handle, index, rules=rules)
+
+
+# ─────────────────────────────────────────────
+# Worker pool
+# ─────────────────────────────────────────────
+class JobQueue:
+    """FIFO of job IDs drained by ``workers`` background tasks.
+
+    The queue is per process, but every process sharing JOBS_DIR sweeps it
+    for unfinished jobs, at startup and every JOB_SWEEP_INTERVAL. A job
+    runs only in the process that claims it. Jobs interrupted by a crash
+    or restart are therefore picked up once, by whichever process claims
+    them first.
+
+    ``runner(job)`` does the analysis and returns the response dict. A
+    ValueError fails the job with its message; anything else is logged
+    and fails the job with a generic one.
+    """
+
+    def __init__(self, store: JobStore, runner, workers: int = JOB_WORKERS):
+        self.store = store
+        self.runner = runner
+        self.workers = workers
+        self._queue = asyncio.Queue()
+        self._queued = set()
+        self._tasks = []
+
+    def submit(self, job: dict):
+        job_id = job["job_id"]
+        if job_id in self._queued or job_id in self.store.jobs:
+            return
+
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        self._tasks = [
+            asyncio.ensure_future(self._work()) for _ in range(self.workers)
+        ]
+        self._tasks.append(asyncio.ensure_future(self._sweep()))
+
+    async def _sweep(self):
+        while True:
+            try:
+                pending = await asyncio.to_thread(self.store.sweep)
+            except OSError:
+                logger.exception("Job sweep failed")
+            else:
+                for job in pending:
+                    self.submit(job)
+
+            await asyncio.sleep(JOB_SWEEP_INTERVAL)
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+
+            lock = self.store.claim(job_id)
+            if lock is None:
+                continue  # running in another process
+
+            try:
+                await self._run(job_id)
+            finally:
+                self.store.release(lock)
+
+    async def _run(self, job_id: str):
+        # Re-read under the claim: another process may have finished it
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return
+
+        if not self.store.input_paths(job)[0].exists():
+            self.store.mark_failed(job, "Job input was lost before it could run.")
+            return
+
+        self.store.mark_running(job)
+        try:
+            result = await self.runner(job)
+            await asyncio.to_thread(self.store.save_result, job, result)
+        except ValueError as exc:
+            self.store.mark_failed(job, str(exc))
+        except Exception:
+            logger.exception("Job %s failed", job_id)
+            self.store.mark_failed(job, "Analysis failed.")
+        else:
+            self.store.mark_done(job)
@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
 import os
-from groq import Groq
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -7,16 +12,24 @@ from pathlib import Path
 env_path = Path(__file__).parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-api_key = os.getenv("GROQ_API_KEY")
+MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
 
-if not api_key:
-    raise ValueError("GROQ_API_KEY not found in environment variables.")
+# "groq", "stub" (local stand-in for load tests), or "none" for rules-only
+# deployments that never call an LLM. Rules-only must be chosen explicitly,
+# so a missing GROQ_API_KEY is an error rather than a silent downgrade.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
 
-# ✅ Initialize Groq client
-client = Groq(api_key=api_key)
+RULES_ONLY_MECHANISM = "Mechanism explanation unavailable (rules-only mode)."
 
+# Stub provider: per-call latency ~ distribution(mean, jitter), failing at error_rate
+STUB_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0.5"))
+STUB_JITTER = float(os.getenv("STUB_LLM_JITTER", "0.1"))
+STUB_DISTRIBUTION = os.getenv("STUB_LLM_DISTRIBUTION", "normal")  # or "lognormal", "fixed"
+STUB_ERROR_RATE = float(os.getenv("STUB_LLM_ERROR_RATE", "0"))
+STUB_SEED = os.getenv("STUB_LLM_SEED")
 
-def generate_mechanism(gene, diplotype, phenotype, drug, risk, variants):
+
+def build_messages(gene, diplotype, drug, variants):
 
     prompt = f"""
     You are a pharmacogenomics specialist.
@@ -46,17 +59,183 @@ def generate_mechanism(gene, diplotype, phenotype, drug, risk, variants):
     Return plain professional medical explanation.
     """
 
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
-            {"role": "system", "content": "You are a precise clinical AI assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1
-    )
+    return [
+        {"role": "system", "content": "You are a precise clinical AI assistant."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+# ─────────────────────────────────────────────
+# Providers
+# ─────────────────────────────────────────────
+class LLMProvider(ABC):
+    """Turns chat messages into a completion; one instance per process."""
+
+    name = None
+
+    @abstractmethod
+    def complete(self, messages: list) -> str:
+        ...
+
+    @abstractmethod
+    async def acomplete(self, messages: list) -> str:
+        ...
+
+
+class GroqProvider(LLMProvider):
+
+    name = "groq"
+
+    def __init__(self, model: str = MODEL):
+        # Imported here so booting a worker does not pay for the SDK
+        from groq import Groq, AsyncGroq
+
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY not found in environment variables.")
+
+        # The async client reuses pooled connections
+        self.client = Groq(api_key=api_key)
+        self.async_client = AsyncGroq(api_key=api_key)
+        self.model = model
+
+    def complete(self, messages):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.1
+        )
+        return response.choices[0].message.content.strip()
+
+    async def acomplete(self, messages):
+        # Cancelling the awaiting task aborts the underlying HTTP request
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.1
+        )
+        return response.choices[0].message.content.strip()
+
+
+class RulesOnlyProvider(LLMProvider):
+
+    name = "none"
+
+    def complete(self, messages):
+        return RULES_ONLY_MECHANISM
+
+    async def acomplete(self, messages):
+        return RULES_ONLY_MECHANISM
+
+
+class StubLLMError(RuntimeError):
+    pass
+
+
+class StubProvider(LLMProvider):
+    """Network-free stand-in with a configurable latency and failure profile.
+
+    Replies are a deterministic function of the prompt, so cached and fresh
+    answers agree. ``lognormal`` treats ``latency`` as the median and gives
+    the long tail a real provider has; ``normal`` is clipped at zero.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = STUB_LATENCY, jitter: float = STUB_JITTER,
+                 distribution: str = STUB_DISTRIBUTION,
+                 error_rate: float = STUB_ERROR_RATE, seed=STUB_SEED):
+        if distribution not in ("fixed", "normal", "lognormal"):
+            raise ValueError(f"Unknown STUB_LLM_DISTRIBUTION {distribution!r}.")
+
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+    def sample(self):
+        """Return (delay seconds, whether this call fails)."""
+
+        if self.distribution == "fixed" or self.jitter <= 0 or self.latency <= 0:
+            delay = self.latency
+        elif self.distribution == "lognormal":
+            delay = self.latency * self.random.lognormvariate(0, self.jitter / self.latency)
+        else:
+            delay = self.random.gauss(self.latency, self.jitter)
+
+        return max(delay, 0.0), self.random.random() < self.error_rate
+
+    def reply(self, messages):
+        digest = hashlib.sha256(messages[-1]["content"].encode()).hexdigest()[:12]
+        return f"Stub mechanism explanation {digest}."
+
+    def complete(self, messages):
+        delay, failed = self.sample()
+        time.sleep(delay)
+        if failed:
+            raise StubLLMError("Stub provider injected failure.")
+        return self.reply(messages)
+
+    async def acomplete(self, messages):
+        delay, failed = self.sample()
+        await asyncio.sleep(delay)
+        if failed:
+            raise StubLLMError("Stub provider injected failure.")
+        return self.reply(messages)
+
+
+PROVIDERS = {
+    "groq": GroqProvider,
+    "stub": StubProvider,
+    "none": RulesOnlyProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def check_provider_config():
+    """Fail fast on a provider that cannot work, without building its client."""
+
+    if LLM_PROVIDER not in PROVIDERS:
+        raise ValueError(
+            f"Unknown LLM_PROVIDER {LLM_PROVIDER!r}; "
+            f"use one of: {', '.join(PROVIDERS)}."
+        )
+
+    if LLM_PROVIDER == "groq" and not os.getenv("GROQ_API_KEY"):
+        raise ValueError(
+            "GROQ_API_KEY not found in environment variables; "
+            "set it, or set LLM_PROVIDER=none for rules-only mode."
+        )
+
+
+def get_provider() -> LLMProvider:
+    """Build the configured provider on first use."""
+
+    global _provider
+
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                check_provider_config()
+                _provider = PROVIDERS[LLM_PROVIDER]()
+
+    return _provider
+
+
+def llm_enabled():
+    # Rules-only mode still serves pre-generated and cached explanations
+    return LLM_PROVIDER != "none"
+
+
+def generate_mechanism(gene, diplotype, phenotype, drug, risk, variants):
+    return get_provider().complete(build_messages(gene, diplotype, drug, variants))
 
-    return response.choices[0].message.content.strip()
 
+async def generate_mechanism_async(gene, diplotype, phenotype, drug, risk, variants):
+    return await get_provider().acomplete(build_messages(gene, diplotype, drug, variants))
 
 
 
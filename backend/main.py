@@ -1,26 +1,66 @@
-from fastapi import FastAPI, UploadFile, Form, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
-from datetime import datetime
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from functools import partial
+from typing import List, Optional
+from urllib.parse import urlencode
 import asyncio
+import hmac
+import json
+import logging
+import os
+import time
+import zlib
 
 # Rate limiting
-from slowapi import Limiter
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 from slowapi.middleware import SlowAPIMiddleware
 
-from vcf_parser import parse_vcf
-from rule_engine import (
-    calculate_confidence,
-    determine_star,
-    determine_phenotype,
-    assess_risk,
-    determine_zygosity,
-    calculate_activity_score,
-    get_alternative_drugs,
+from vcf_parser import VCFStreamParser, parse_indexed_vcf
+from parallel_parse import parse_vcf_fileobj_parallel, use_parallel_parse
+from batch import (
+    VCF_EXTENSIONS,
+    COMPRESSED_EXTENSIONS,
+    close_uploads,
+    detach_uploads,
+    list_batch_sources,
+    parse_batch_source,
 )
-from llm_service import generate_mechanism
-from mappings import DRUG_RULES
+from bgzf import GzipStreamDecoder, read_index
+from analysis import evaluate_panel, parse_drug_list
+from llm_service import (
+    LLM_PROVIDER,
+    RULES_ONLY_MECHANISM,
+    check_provider_config,
+    generate_mechanism_async,
+    llm_enabled
+)
+from mechanism_cache import build_cache
+from metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    RequestTimer,
+    Stopwatch
+)
+from mechanism_store import (
+    describe_combination,
+    load_store,
+    mechanism_key,
+    reachable_diplotypes,
+    split_mechanism_key,
+)
+from profiling import current_profile, profile_path, profile_request, profiled, profiling_active
+from rules_store import rules_store, current_rules
+from jobs import JobStore, JobQueue, FINISHED, DONE, parse_job_input
+from utils import AdmissionLimiter, Overloaded, SingleFlight, imap_unordered
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -38,45 +78,479 @@ app.add_middleware(
 # =========================
 # Rate Limiter
 # =========================
-limiter = Limiter(key_func=get_remote_address)
+# RATE_LIMIT_ENABLED=0 lifts per-client limits, e.g. for load testing
+limiter = Limiter(
+    key_func=get_remote_address,
+    enabled=os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+)
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
 
 # =========================
-# Concurrency Control
+# Metrics (GET /metrics)
+# =========================
+REQUEST_SECONDS = Histogram(
+    "pharmaguard_http_request_duration_seconds",
+    "Time to response start by route and status.",
+    ("method", "route", "status")
+)
+STAGE_SECONDS = Histogram(
+    "pharmaguard_stage_duration_seconds",
+    "Per-request time in each analysis stage "
+    "(upload_read, decode, parse, rules, explain).",
+    ("stage",)
+)
+RULE_SECONDS = Histogram(
+    "pharmaguard_rule_evaluation_seconds",
+    "Rule-engine time per drug evaluation, averaged over each panel.",
+    buckets=(1e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3)
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "pharmaguard_admission_wait_seconds",
+    "Time queued for a CPU or LLM slot.",
+    ("budget",)
+)
+LLM_SECONDS = Histogram(
+    "pharmaguard_llm_call_duration_seconds",
+    "Outbound explanation calls by outcome (ok, error, cancelled).",
+    ("outcome",)
+)
+LLM_TIMEOUTS = Counter(
+    "pharmaguard_llm_timeouts_total",
+    "Explanations cut off by the per-request deadline."
+)
+CACHE_LOOKUPS = Counter(
+    "pharmaguard_mechanism_cache_lookups_total",
+    "Mechanism cache lookups by result (hit, miss).",
+    ("result",)
+)
+RATE_LIMITED = Counter(
+    "pharmaguard_rate_limited_total",
+    "Requests rejected by per-client rate limits.",
+    ("route",)
+)
+
+
+def cache_hit_ratio():
+    hits = CACHE_LOOKUPS.value(result="hit")
+    total = hits + CACHE_LOOKUPS.value(result="miss")
+    return {(): hits / total if total else 0.0}
+
+
+Gauge(
+    "pharmaguard_mechanism_cache_hit_ratio",
+    "Share of mechanism lookups served from the store or cache.",
+    cache_hit_ratio
+)
+
+app.add_middleware(RequestTimer, histogram=REQUEST_SECONDS)
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limited_handler(request: Request, exc: RateLimitExceeded):
+    RATE_LIMITED.inc(route=getattr(request.scope.get("route"), "path", request.url.path))
+    return _rate_limit_exceeded_handler(request, exc)
+
+# =========================
+# Admission Control
 # =========================
-MAX_CONCURRENT_ANALYSES = 2
-analysis_semaphore = asyncio.Semaphore(MAX_CONCURRENT_ANALYSES)
+# Parse + rule evaluation is CPU work, sized to the machine; explanation
+# fetches are outbound I/O with their own budget, so a request waiting on
+# the LLM no longer holds back other requests' parsing
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+CPU_QUEUE_SIZE = int(os.getenv("CPU_QUEUE_SIZE", str(4 * CPU_WORKERS)))
+ADMISSION_TIMEOUT = float(os.getenv("ADMISSION_TIMEOUT", "10"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+RETRY_AFTER = 5
+
+cpu_limiter = AdmissionLimiter(
+    "cpu", CPU_WORKERS, CPU_QUEUE_SIZE, ADMISSION_TIMEOUT,
+    on_wait=partial(ADMISSION_WAIT_SECONDS.observe, budget="cpu")
+)
+llm_limiter = AdmissionLimiter(
+    "llm", LLM_CONCURRENCY,
+    on_wait=partial(ADMISSION_WAIT_SECONDS.observe, budget="llm")
+)
+
+
+def limiter_stat(stat: str):
+    return lambda: {
+        budget.name: budget.stats()[stat] for budget in (cpu_limiter, llm_limiter)
+    }
+
+
+Gauge("pharmaguard_admission_slots_in_use", "Held CPU/LLM slots.",
+      limiter_stat("in_use"), ("budget",))
+Gauge("pharmaguard_admission_slots_limit", "CPU/LLM slot budgets.",
+      limiter_stat("limit"), ("budget",))
+Gauge("pharmaguard_admission_waiting", "Callers queued for a CPU/LLM slot.",
+      limiter_stat("waiting"), ("budget",))
+Gauge("pharmaguard_admission_rejected_total", "Requests shed with 503 per budget.",
+      limiter_stat("rejected"), ("budget",), kind="counter")
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy. Please retry shortly."},
+        headers={"Retry-After": str(RETRY_AFTER)}
+    )
 
 # =========================
-# File Size Limit (2MB)
+# Streaming Upload
 # =========================
-MAX_FILE_SIZE = 2 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+INDEX_EXTENSIONS = (".tbi", ".csi")
+
+# Patient files analysed concurrently by one /analyze/batch request
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
 
 # =========================
-# Simple In-Memory Cache
+# Mechanism Cache (pre-generated store + LRU + shared SQLite, TTL)
 # =========================
-mechanism_cache = {}
+mechanism_cache = build_cache(store=load_store())
+
+# Concurrent requests for the same cache key share one LLM call
+mechanism_flights = SingleFlight()
+LLM_TIMEOUT = 15
+
+# The LLM client is built on the first cache miss, not at import, so
+# workers boot fast; a misconfigured provider still fails the boot
+check_provider_config()
+logger.info("Explanation provider: %s", LLM_PROVIDER)
+
+# How /analyze delivers biological_mechanism:
+#   inline   - wait for explanations (default)
+#   deferred - return rule-engine output at once, prefetch explanations
+#              in the background for GET /explanations
+#   none     - rule-engine output only
+EXPLAIN_MODES = ("inline", "deferred", "none")
 
 # =========================
-# Helper Functions
+# Hot-Reloadable Rules
 # =========================
-def severity_to_color(severity: str):
-    if severity in ["none", "low"]:
-        return "green"
-    if severity == "moderate":
-        return "orange"
-    return "red"
+RULES_RELOAD_INTERVAL = float(os.getenv("RULES_RELOAD_INTERVAL", "30"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def check_admin_token(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled.")
+
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token.")
+
+
+@rules_store.on_change
+def invalidate_mechanisms(old, new, genes, drugs):
+    # Only explanations for genes/drugs whose guideline data changed are dropped
+    def affected(key):
+        gene, _, drug = split_mechanism_key(key)
+        return gene in genes or drug in drugs
 
+    dropped = mechanism_cache.invalidate(affected)
+    logger.info(
+        "Rules %s -> %s: %d genes, %d drugs changed, %d explanations dropped",
+        old.version, new.version, len(genes), len(drugs), dropped
+    )
 
-def severity_to_urgency(severity: str):
-    if severity in ["none", "low"]:
-        return "Routine"
-    if severity == "moderate":
-        return "Urgent"
-    if severity in ["high", "critical"]:
-        return "Emergency"
-    return "Routine"
+
+async def watch_rules():
+    # Picks up edits to the rule file, including ones published by other workers
+    while True:
+        await asyncio.sleep(RULES_RELOAD_INTERVAL)
+        try:
+            await run_in_threadpool(rules_store.reload_if_changed)
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.error("Keeping rules %s; reload failed: %s",
+                         current_rules().version, exc)
+
+
+@app.on_event("startup")
+async def start_rules_watcher():
+    if RULES_RELOAD_INTERVAL > 0:
+        asyncio.create_task(watch_rules())
+
+
+# =========================
+# LLM with Cache + Deadline
+# =========================
+async def call_llm(llm_args: tuple):
+    # Coalesced requests share one slot; the request deadline bounds the wait
+    async with llm_limiter.slot(bounded=False):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            mechanism = await generate_mechanism_async(*llm_args)
+            outcome = "ok"
+            return mechanism
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            LLM_SECONDS.observe(elapsed, outcome=outcome)
+
+            # Network waits are timed, not traced, so profiling never holds a thread
+            if profiling_active():
+                current_profile.get().record_wait(f"llm_{outcome}", elapsed)
+
+
+async def fetch_mechanism(cache_key: str, llm_args: tuple):
+    mechanism = await mechanism_cache.aget(cache_key)
+    if mechanism is not None:
+        CACHE_LOOKUPS.inc(result="hit")
+        return mechanism
+
+    CACHE_LOOKUPS.inc(result="miss")
+
+    # Rules-only: serve what the store and cache have, never cache the stand-in
+    if not llm_enabled():
+        return RULES_ONLY_MECHANISM
+
+    try:
+        mechanism = await mechanism_flights.do(cache_key, partial(call_llm, llm_args))
+    except Exception as exc:
+        # A provider error degrades this explanation like a timeout does
+        logger.warning("Explanation %s failed: %s", cache_key, exc)
+        mechanism = "Mechanism explanation unavailable (error)."
+        await mechanism_cache.aset_failure(cache_key, mechanism)
+        return mechanism
+
+    await mechanism_cache.aset(cache_key, mechanism)
+    return mechanism
+
+
+async def iter_mechanisms(requests: dict):
+    """Yield (cache_key, mechanism) for {cache_key: llm_args} as each resolves.
+
+    All explanations are fetched concurrently under one per-request deadline,
+    so latency follows the slowest drug rather than the sum of all drugs.
+    """
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + LLM_TIMEOUT
+
+    tasks = {
+        asyncio.ensure_future(fetch_mechanism(cache_key, llm_args)): cache_key
+        for cache_key, llm_args in requests.items()
+    }
+    pending = set(tasks)
+
+    try:
+        while pending and loop.time() < deadline:
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=deadline - loop.time(),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield tasks[task], task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        STAGE_SECONDS.observe(loop.time() - started, stage="explain")
+
+    for task in pending:
+        cache_key = tasks[task]
+
+        if task.cancelled():
+            LLM_TIMEOUTS.inc()
+            mechanism = "Mechanism explanation unavailable (timeout)."
+            await mechanism_cache.aset_failure(cache_key, mechanism)
+            yield cache_key, mechanism
+        else:
+            # Finished between the deadline and its cancellation
+            yield cache_key, task.result()
+
+
+async def resolve_mechanisms(requests: dict):
+    return {
+        cache_key: mechanism
+        async for cache_key, mechanism in iter_mechanisms(requests)
+    }
+
+
+def mechanism_requests(evaluations: list):
+    requests = {}
+    for evaluation in evaluations:
+        requests.setdefault(evaluation.cache_key, evaluation.llm_args)
+    return requests
+
+
+async def attach_mechanisms(evaluations: list):
+    mechanisms = await resolve_mechanisms(mechanism_requests(evaluations))
+
+    for evaluation in evaluations:
+        evaluation.result["llm_explanation"]["biological_mechanism"] = (
+            mechanisms[evaluation.cache_key]
+        )
+
+
+# Explanations prefetched after a deferred response; kept so they are not GC'd
+prefetch_tasks = set()
+
+
+def defer_mechanisms(evaluations: list, prefetch: bool):
+    # Results go out immediately; clients fetch each explanation separately
+    for evaluation in evaluations:
+        gene, diplotype, _, drug, _, _ = evaluation.llm_args
+        evaluation.result["llm_explanation"]["explanation_url"] = (
+            "/explanations?" + urlencode(
+                {"gene": gene, "diplotype": diplotype, "drug": drug}
+            )
+        )
+
+    if prefetch:
+        task = asyncio.ensure_future(
+            resolve_mechanisms(mechanism_requests(evaluations))
+        )
+        prefetch_tasks.add(task)
+        task.add_done_callback(prefetch_done)
+
+
+def prefetch_done(task: asyncio.Task):
+    prefetch_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Explanation prefetch failed: %s", task.exception())
+
+
+def feed_chunk(parser: VCFStreamParser, decoder, stopwatch: Stopwatch, chunk: bytes):
+    # Inflate and parse are both CPU-bound, so they share one threadpool hop.
+    # A compressed chunk is parsed piece by piece as it inflates.
+    if not decoder:
+        parser.feed(chunk)
+        return
+
+    for piece in decoder.decompress(chunk):
+        stopwatch.lap("decode")
+        parser.feed(piece)
+        stopwatch.lap("parse")
+
+
+async def stream_vcf_variants(file: UploadFile, rules):
+    parser = VCFStreamParser(rules=rules)
+    decoder = None
+    stopwatch = Stopwatch()
+
+    if file.filename.endswith(COMPRESSED_EXTENSIONS):
+        decoder = GzipStreamDecoder()
+
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        stopwatch.lap("upload_read")
+        if not chunk:
+            break
+
+        await run_in_threadpool(profiled(feed_chunk), parser, decoder, stopwatch, chunk)
+        stopwatch.lap("parse")
+
+    if decoder:
+        decoder.close()
+
+    # Freezing decodes every retained genotype, so it leaves the loop too
+    variant_table = await run_in_threadpool(profiled(parser.close))
+    stopwatch.lap("parse")
+    stopwatch.report(STAGE_SECONDS)
+
+    return variant_table
+
+
+def check_explain_mode(explain: str):
+    if explain not in EXPLAIN_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid explain mode. Use one of: {', '.join(EXPLAIN_MODES)}."
+        )
+
+
+def check_upload_types(file: UploadFile, index: Optional[UploadFile]):
+
+    if not file.filename.endswith(VCF_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid file type. Please upload a valid .vcf or .vcf.gz genomic file."
+        )
+
+    if index is None:
+        return
+
+    if not file.filename.endswith(COMPRESSED_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail="An index can only be used with a bgzip-compressed .vcf.gz file."
+        )
+
+    if not index.filename.endswith(INDEX_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid index type. Please upload a .tbi or .csi index."
+        )
+
+
+def upload_size(file: UploadFile):
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+    return size
+
+
+async def load_vcf_variants(file: UploadFile, index: Optional[UploadFile], rules):
+
+    if index is None:
+        # Large plain-text uploads are scanned across the process pool
+        if not file.filename.endswith(COMPRESSED_EXTENSIONS) and use_parallel_parse(
+            upload_size(file)
+        ):
+            with STAGE_SECONDS.time(stage="parse"):
+                return await run_in_threadpool(
+                    profiled(parse_vcf_fileobj_parallel), file.file, rules
+                )
+
+        return await stream_vcf_variants(file, rules)
+
+    with STAGE_SECONDS.time(stage="upload_read"):
+        vcf_index = read_index(await index.read())
+
+    # Seek straight to the pharmacogene loci instead of scanning the genome
+    with STAGE_SECONDS.time(stage="parse"):
+        return await run_in_threadpool(
+            profiled(parse_indexed_vcf), file.file, vcf_index, rules=rules
+        )
+
+
+def evaluate_panel_timed(variant_table, drug_list: list, rules):
+    start = time.perf_counter()
+    evaluations = evaluate_panel(variant_table, drug_list, rules)
+
+    if evaluations:
+        RULE_SECONDS.observe((time.perf_counter() - start) / len(evaluations))
+
+    return evaluations
+
+
+async def evaluate_table(variant_table, drug_list: list, rules):
+    # One threadpool hop for every deterministic rule evaluation
+    with STAGE_SECONDS.time(stage="rules"):
+        return await run_in_threadpool(
+            profiled(evaluate_panel_timed), variant_table, drug_list, rules
+        )
+
+
+async def explain_table(variant_table, evaluations: list, explain: str = "inline"):
+    if explain == "inline":
+        await attach_mechanisms(evaluations)
+    else:
+        defer_mechanisms(evaluations, prefetch=explain == "deferred")
+
+    return {
+        "samples": variant_table.samples,
+        "results": [evaluation.result for evaluation in evaluations]
+    }
 
 
 # =========================
@@ -86,152 +560,426 @@ def severity_to_urgency(severity: str):
 @limiter.limit("5/minute")
 async def analyze_vcf(
     request: Request,
+    response: Response,
     file: UploadFile,
-    drugs: str = Form(...)
+    drugs: str = Form(...),
+    index: Optional[UploadFile] = File(None),
+    explain: str = Form("inline"),
+    x_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None)
 ):
 
-    async with analysis_semaphore:
+    check_upload_types(file, index)
+    check_explain_mode(explain)
+
+    if (x_profile or "").strip().lower() in ("1", "true"):
+        check_admin_token(x_admin_token)
+        return await profile_analysis(response, file, index, drugs, explain)
+
+    return await run_analysis(file, index, drugs, explain)
+
+
+async def run_analysis(file: UploadFile, index: Optional[UploadFile], drugs: str, explain: str):
+    # Parsing and evaluation see one rule set even if a reload lands mid-request
+    rules = current_rules()
+
+    variant_table, evaluations = await evaluate_upload(file, index, drugs, rules)
+
+    return await explain_table(variant_table, evaluations, explain)
+
+
+async def profile_analysis(response: Response, file: UploadFile,
+                           index: Optional[UploadFile], drugs: str, explain: str):
+    # Profiles failed requests too; the id travels on HTTP error responses
+    label = f"POST /analyze {file.filename} drugs={drugs} explain={explain}"
 
-        if not file.filename.endswith(".vcf"):
+    try:
+        with profile_request(label) as profile:
+            result = await run_analysis(file, index, drugs, explain)
+    except HTTPException as exc:
+        exc.headers = {**(exc.headers or {}), **profile_headers(profile)}
+        raise
+    finally:
+        # Runs once the block has stopped the clock, whatever was raised
+        await run_in_threadpool(profile.save)
+        logger.info("Saved request profile %s", profile.id)
+
+    response.headers.update(profile_headers(profile))
+    return result
+
+
+def profile_headers(profile):
+    return {
+        "X-Profile-Id": profile.id,
+        "X-Profile-Url": f"/admin/profiles/{profile.id}"
+    }
+
+
+async def evaluate_upload(file: UploadFile, index: Optional[UploadFile], drugs: str, rules):
+
+    async with cpu_limiter.slot():
+
+        try:
+            variant_table = await load_vcf_variants(file, index, rules)
+        except (ValueError, zlib.error):
             raise HTTPException(
                 status_code=400,
-                detail="Invalid file type. Please upload a valid .vcf genomic file."
+                detail="Could not decode the VCF file or its index."
             )
 
-        content = await file.read()
-
-        if len(content) > MAX_FILE_SIZE:
+        if not len(variant_table):
             raise HTTPException(
-                status_code=413,
-                detail="VCF file too large. Maximum allowed size is 2MB."
+                status_code=400,
+                detail="VCF file parsed but no pharmacogenomic variants detected."
             )
 
-        content = content.decode("utf-8")
+        evaluations = await evaluate_table(variant_table, parse_drug_list(drugs), rules)
 
-        # Run parsing in threadpool (CPU safe)
-        parsed_variants = await run_in_threadpool(parse_vcf, content)
+    return variant_table, evaluations
 
-        if not parsed_variants:
-            raise HTTPException(
-                status_code=400,
-                detail="VCF file parsed but no pharmacogenomic variants detected."
+
+# =========================
+# STREAMING ENDPOINT
+# =========================
+def format_event(event: str, data: dict, sse: bool):
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+
+@app.post("/analyze/stream")
+@limiter.limit("5/minute")
+async def analyze_vcf_stream(
+    request: Request,
+    file: UploadFile,
+    drugs: str = Form(...),
+    index: Optional[UploadFile] = File(None)
+):
+    """Same analysis as /analyze, streamed as events:
+
+        samples    {"samples": [...]}
+        result     {"index": i, "result": {...}}   biological_mechanism is null
+        mechanism  {"indices": [i, ...], "biological_mechanism": "..."}
+        done       {}
+        error      {"detail": "..."}
+
+    NDJSON by default (one {"event": ..., ...} object per line), or
+    server-sent events when the client sends Accept: text/event-stream.
+    """
+
+    check_upload_types(file, index)
+
+    rules = current_rules()
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    # Upload and rule errors are still reported as plain HTTP errors
+    variant_table, evaluations = await evaluate_upload(file, index, drugs, rules)
+
+    indices = {}
+    for i, evaluation in enumerate(evaluations):
+        indices.setdefault(evaluation.cache_key, []).append(i)
+
+    async def stream_events():
+        yield format_event("samples", {"samples": variant_table.samples}, sse)
+
+        # Deterministic results go out before any explanation is fetched
+        for i, evaluation in enumerate(evaluations):
+            yield format_event("result", {"index": i, "result": evaluation.result}, sse)
+
+        try:
+            async for cache_key, mechanism in iter_mechanisms(
+                mechanism_requests(evaluations)
+            ):
+                yield format_event("mechanism", {
+                    "indices": indices[cache_key],
+                    "biological_mechanism": mechanism
+                }, sse)
+        except Exception:
+            logger.exception("Explanation stream failed")
+            yield format_event("error", {"detail": "Explanation generation failed."}, sse)
+            return
+
+        yield format_event("done", {}, sse)
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# =========================
+# EXPLANATION ENDPOINT
+# =========================
+@app.get("/explanations")
+@limiter.limit("60/minute")
+async def get_explanation(request: Request, gene: str, diplotype: str, drug: str):
+    # Companion to explain=deferred/none: one mechanism per gene/diplotype/drug
+    rules = current_rules()
+    gene, drug = gene.upper(), drug.upper()
+
+    # Only keys the rule engine can produce, so arbitrary input never reaches the LLM
+    if rules.gene_for_drug(drug) != gene or diplotype not in reachable_diplotypes(gene, rules):
+        raise HTTPException(status_code=404, detail="Unknown gene/diplotype/drug combination.")
+
+    combo = describe_combination(gene, diplotype, drug, rules)
+    cache_key = mechanism_key(gene, diplotype, drug)
+
+    mechanisms = await resolve_mechanisms({
+        cache_key: (
+            gene, diplotype, combo["phenotype"], drug, combo["risk"], combo["variants"]
+        )
+    })
+
+    return {
+        "gene": gene,
+        "diplotype": diplotype,
+        "drug": drug,
+        "biological_mechanism": mechanisms[cache_key]
+    }
+
+# =========================
+# BATCH ENDPOINT
+# =========================
+async def analyze_batch_source(source, drug_list: list, rules, explain: str):
+    name, opener = source
+
+    try:
+        # The batch worker pool already bounds this, so wait rather than shed
+        async with cpu_limiter.slot(bounded=False):
+            variant_table = await run_in_threadpool(
+                parse_batch_source, name, opener, rules
             )
 
-        drug_list = [d.strip().upper() for d in drugs.split(",")]
-        results = []
-
-        for drug_name in drug_list:
-
-            rule = DRUG_RULES.get(drug_name)
-            if not rule:
-                continue
-
-            gene = rule["gene"]
-            gene_variants = [v for v in parsed_variants if v["gene"] == gene]
-
-            # Run heavy logic in threadpool
-            diplotype = await run_in_threadpool(determine_star, gene, gene_variants)
-            activity_score = await run_in_threadpool(calculate_activity_score, gene, diplotype)
-            phenotype = await run_in_threadpool(determine_phenotype, gene, diplotype)
-            alternatives = await run_in_threadpool(get_alternative_drugs, drug_name, phenotype)
-
-            detected_variants = []
-
-            for variant in gene_variants:
-                detected_variants.append({
-                    "rsid": variant["rsid"],
-                    "star": variant.get("star", "*1"),
-                    "fn": variant.get("impact", "Unknown"),
-                    "chrom": variant["chrom"],
-                    "pos": variant["pos"],
-                    "ref": variant["ref"],
-                    "alt": variant["alt"],
-                    "zygosity": determine_zygosity(variant["genotype"])
-                })
-
-            risk_data = await run_in_threadpool(assess_risk, drug_name, phenotype)
-
-            confidence = await run_in_threadpool(
-                calculate_confidence,
-                gene,
-                diplotype,
-                phenotype,
-                drug_name,
-                detected_variants
+            if not len(variant_table):
+                return {
+                    "file": name,
+                    "error": "VCF file parsed but no pharmacogenomic variants detected."
+                }
+
+            evaluations = await evaluate_table(variant_table, drug_list, rules)
+
+        return {
+            "file": name,
+            **await explain_table(variant_table, evaluations, explain)
+        }
+
+    except (ValueError, zlib.error):
+        return {"file": name, "error": "Could not decode the VCF file."}
+
+    except Exception:
+        # One bad patient file must not abort the rest of the batch
+        logger.exception("Batch analysis failed for %s", name)
+        return {"file": name, "error": "Analysis failed."}
+
+
+@app.post("/analyze/batch")
+@limiter.limit("5/minute")
+async def analyze_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    drugs: str = Form(...),
+    explain: str = Form("inline")
+):
+
+    check_explain_mode(explain)
+
+    # Parsing and evaluation see one rule set for the whole batch
+    rules = current_rules()
+
+    uploads = await run_in_threadpool(
+        detach_uploads, [(file.filename, file.file) for file in files]
+    )
+
+    try:
+        sources = await run_in_threadpool(list_batch_sources, uploads)
+    except ValueError as exc:
+        close_uploads(uploads)
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    if not sources:
+        close_uploads(uploads)
+        raise HTTPException(status_code=400, detail="No VCF files found in the batch.")
+
+    drug_list = parse_drug_list(drugs)
+    analyze = partial(
+        analyze_batch_source, drug_list=drug_list, rules=rules, explain=explain
+    )
+
+    async def stream_results():
+        # Per-patient results are sent as soon as each file completes
+        try:
+            async for result in imap_unordered(analyze, sources, BATCH_WORKERS):
+                yield json.dumps(result) + "\n"
+        finally:
+            close_uploads(uploads)
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+# =========================
+# JOB QUEUE
+# =========================
+JOB_MAX_WAIT = 60
+
+
+async def run_analysis_job(job: dict):
+    rules = current_rules()
+    vcf_path, index_path = job_store.input_paths(job)
+
+    async with cpu_limiter.slot(bounded=False):
+        try:
+            variant_table = await run_in_threadpool(
+                parse_job_input, vcf_path, index_path, job["file"], rules
             )
+        except (ValueError, zlib.error):
+            raise ValueError("Could not decode the VCF file or its index.")
+
+        if not len(variant_table):
+            raise ValueError("VCF file parsed but no pharmacogenomic variants detected.")
+
+        evaluations = await evaluate_table(
+            variant_table, parse_drug_list(job["drugs"]), rules
+        )
+
+    return await explain_table(variant_table, evaluations)
+
+
+job_store = JobStore()
+job_queue = JobQueue(job_store, run_analysis_job)
+
+
+@app.on_event("startup")
+async def start_job_workers():
+    # Re-queues jobs interrupted by a restart
+    job_queue.start()
+
+
+def get_job_or_404(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@app.post("/jobs", status_code=202)
+@limiter.limit("30/minute")
+async def submit_job(
+    request: Request,
+    file: UploadFile,
+    drugs: str = Form(...),
+    index: Optional[UploadFile] = File(None)
+):
+
+    check_upload_types(file, index)
+
+    job = await run_in_threadpool(
+        job_store.create,
+        file.filename,
+        drugs,
+        file.file,
+        index.file if index else None,
+        index.filename if index else None
+    )
+    job_queue.submit(job)
+
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "queue_depth": job_queue.depth(),
+        "status_url": f"/jobs/{job['job_id']}",
+        "result_url": f"/jobs/{job['job_id']}/result"
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    # wait > 0 long-polls until the job finishes (capped at JOB_MAX_WAIT seconds)
+    get_job_or_404(job_id)
+    return await job_store.wait(job_id, min(wait, JOB_MAX_WAIT))
 
-            summary = (
-                f"The patient has {gene} {diplotype}, consistent with "
-                f"{phenotype} phenotype. According to CPIC guidelines, "
-                f"{drug_name} is classified as '{risk_data['risk']}'."
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = get_job_or_404(job_id)
+
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+
+    if job["status"] != DONE:
+        raise HTTPException(status_code=422, detail=job["error"])
+
+    return await run_in_threadpool(job_store.result, job_id)
+
+
+# =========================
+# METRICS
+# =========================
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Per worker process; see metrics.py
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/status/queues")
+async def queue_status():
+    return {
+        "cpu": cpu_limiter.stats(),
+        "llm": llm_limiter.stats(),
+        "jobs": {"queued": job_queue.depth()}
+    }
+
+# =========================
+# ADMIN: REQUEST PROFILES
+# =========================
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = "prof",
+    x_admin_token: Optional[str] = Header(None)
+):
+
+    check_admin_token(x_admin_token)
+
+    if format not in ("prof", "text"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use prof or text.")
+
+    path = profile_path(profile_id, ".prof" if format == "prof" else ".txt")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+
+    if format == "text":
+        return PlainTextResponse(await run_in_threadpool(path.read_text, encoding="utf-8"))
+
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+# =========================
+# ADMIN: RULES RELOAD
+# =========================
+@app.post("/admin/rules/reload")
+async def reload_rules(
+    rules_file: Optional[UploadFile] = File(None),
+    x_admin_token: Optional[str] = Header(None)
+):
+
+    check_admin_token(x_admin_token)
+
+    try:
+        if rules_file is None:
+            genes, drugs = await run_in_threadpool(rules_store.reload)
+        else:
+            genes, drugs = await run_in_threadpool(
+                rules_store.publish, await rules_file.read(), rules_file.filename
             )
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid rule set: {exc}")
 
-            # =========================
-            # LLM with Cache + Timeout
-            # =========================
-            cache_key = f"{gene}-{diplotype}-{drug_name}"
-
-            if cache_key in mechanism_cache:
-                mechanism = mechanism_cache[cache_key]
-            else:
-                try:
-                    mechanism = await asyncio.wait_for(
-                        run_in_threadpool(
-                            generate_mechanism,
-                            gene,
-                            diplotype,
-                            phenotype,
-                            drug_name,
-                            risk_data["risk"],
-                            [v["rsid"] for v in gene_variants]
-                        ),
-                        timeout=15
-                    )
-                except asyncio.TimeoutError:
-                    mechanism = "Mechanism explanation unavailable (timeout)."
-
-                mechanism_cache[cache_key] = mechanism
-
-            results.append({
-                "patient_id": "PATIENT_001",
-                "drug": drug_name,
-                "timestamp": datetime.utcnow().isoformat(),
-                "risk_assessment": {
-                    "risk_label": risk_data["risk"],
-                    "confidence_score": confidence,
-                    "severity": risk_data["severity"],
-                    "color": severity_to_color(risk_data["severity"])
-                },
-                "pharmacogenomic_profile": {
-                    "primary_gene": gene,
-                    "diplotype": diplotype,
-                    "phenotype": phenotype,
-                    "phenotype_label": phenotype,
-                    "activity_score": activity_score,
-                    "detected_variants": detected_variants
-                },
-                "clinical_recommendation": {
-                    "recommended_action": risk_data["recommendation"],
-                    "dosing_adjustment": risk_data["recommendation"],
-                    "urgency": severity_to_urgency(risk_data["severity"]),
-                    "alternative_drugs": alternatives,
-                    "monitoring": "Standard monitoring per CPIC guideline.",
-                    "guideline_reference": f"CPIC {gene}-{drug_name}"
-                },
-                "llm_explanation": {
-                    "summary": summary,
-                    "biological_mechanism": mechanism,
-                    "variant_impact": "Variant impacts enzyme activity affecting drug metabolism.",
-                    "clinical_context": "Recommendation derived from CPIC pharmacogenomic guidelines.",
-                    "evidence_level": "CPIC Level A"
-                },
-                "quality_metrics": {
-                    "vcf_parsing_success": True,
-                    "variants_detected": len(gene_variants),
-                    "genes_analyzed": gene,
-                    "confidence_basis": "Variant + Phenotype + CPIC rule mapping",
-                    "data_completeness": 1.0
-                }
-            })
+    rules = current_rules()
 
-        return {"results": results}
\ No newline at end of file
+    return {
+        "version": rules.version,
+        "fingerprint": rules.fingerprint,
+        "changed_genes": sorted(genes),
+        "changed_drugs": sorted(drugs)
+    }
@@ -0,0 +1,235 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+# ─────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────
+CACHE_BACKEND = os.getenv("MECHANISM_CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv(
+    "MECHANISM_CACHE_PATH",
+    str(Path(__file__).parent / "mechanism_cache.sqlite3")
+)
+CACHE_MAX_ENTRIES = int(os.getenv("MECHANISM_CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL = float(os.getenv("MECHANISM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Failures (timeouts, provider errors) are cached briefly so a struggling
+# provider is not hammered, but are retried soon after
+CACHE_NEGATIVE_TTL = float(os.getenv("MECHANISM_CACHE_NEGATIVE_TTL", "60"))
+
+
+# ─────────────────────────────────────────────
+# In-process LRU tier
+# ─────────────────────────────────────────────
+class LRUCache:
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ─────────────────────────────────────────────
+# On-disk tier (shared across uvicorn workers)
+# ─────────────────────────────────────────────
+class SQLiteCache:
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+
+        with self._lock, self._conn:
+            # WAL lets several worker processes read while one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS mechanism_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str):
+        row = self.get_with_expiry(key)
+        return row[0] if row else None
+
+    def get_with_expiry(self, key: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, expires_at FROM mechanism_cache"
+                " WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+
+    def set(self, key: str, value: str, ttl: float = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mechanism_cache (key, value, expires_at)"
+                " VALUES (?, ?, ?)",
+                (key, value, expires_at)
+            )
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM mechanism_cache WHERE key = ?", (key,))
+
+    def keys(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM mechanism_cache").fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM mechanism_cache WHERE expires_at <= ?", (time.time(),)
+            )
+
+
+# ─────────────────────────────────────────────
+# Tiered cache with negative caching
+# ─────────────────────────────────────────────
+class MechanismCache:
+    """LRU in front of an optional shared on-disk tier.
+
+    A pre-generated, read-only ``store`` (see mechanism_store.py) is checked
+    first. ``set_failure`` stores fallback text with a short TTL so a timeout
+    is served for a while and then retried, instead of being kept forever.
+
+    The ``a*`` methods are for the event loop: the store and LRU are
+    checked inline and SQLite (which may wait up to 5 s on another
+    worker's write lock) runs in a thread.
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteCache = None,
+                 negative_ttl: float = CACHE_NEGATIVE_TTL, store: dict = None):
+        self.memory = memory
+        self.disk = disk
+        self.negative_ttl = negative_ttl
+        self.store = store or {}
+
+    def get(self, key: str):
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        return self.get_disk(key)
+
+    def get_local(self, key: str):
+        value = self.store.get(key)
+        if value is not None:
+            return value
+        return self.memory.get(key)
+
+    def get_disk(self, key: str):
+        if self.disk is None:
+            return None
+
+        row = self.disk.get_with_expiry(key)
+        if row is None:
+            return None
+
+        # Promote to memory without outliving the disk entry
+        value, expires_at = row
+        self.memory.set(key, value, ttl=expires_at - time.time())
+        return value
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def set_failure(self, key: str, value: str):
+        self.memory.set(key, value, ttl=self.negative_ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl=self.negative_ttl)
+
+    async def aget(self, key: str):
+        value = self.get_local(key)
+        if value is not None or self.disk is None:
+            return value
+        return await asyncio.to_thread(self.get_disk, key)
+
+    async def aset(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    async def aset_failure(self, key: str, value: str):
+        self.memory.set(key, value, ttl=self.negative_ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value, self.negative_ttl)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def invalidate(self, predicate):
+        """Drop every key for which ``predicate(key)`` is true, in all tiers."""
+
+        stale = [key for key in self.memory.keys() if predicate(key)]
+        if self.disk is not None:
+            stale += [key for key in self.disk.keys() if predicate(key)]
+        stale += [key for key in self.store if predicate(key)]
+
+        # The store is shared read-only data, so it is replaced, not mutated
+        self.store = {k: v for k, v in self.store.items() if not predicate(k)}
+
+        for key in set(stale):
+            self.delete(key)
+
+        return len(set(stale))
+
+    def __contains__(self, key: str):
+        return self.get(key) is not None
+
+
+def build_cache(store: dict = None):
+    memory = LRUCache()
+
+    if CACHE_BACKEND == "memory":
+        return MechanismCache(memory, store=store)
+
+    return MechanismCache(memory, SQLiteCache(), store=store)
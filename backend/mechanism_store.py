@@ -0,0 +1,209 @@
+"""Offline pre-generation of mechanism explanations.
+
+The (gene, diplotype, drug) key space is finite, so every reachable
+combination can be explained ahead of time and shipped as a versioned JSON
+store that the server loads at startup:
+
+    python mechanism_store.py --out mechanism_store.json --workers 4
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from itertools import permutations
+from pathlib import Path
+
+from rule_engine import determine_phenotype, assess_risk
+from rules_store import current_rules
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.getenv(
+    "MECHANISM_STORE_PATH",
+    str(Path(__file__).parent / "mechanism_store.json")
+)
+
+# Bump when the prompt in llm_service changes meaningfully
+PROMPT_VERSION = 1
+
+
+def mechanism_key(gene: str, diplotype: str, drug: str):
+    return f"{gene}-{diplotype}-{drug}"
+
+
+def split_mechanism_key(key: str):
+    # Inverse of mechanism_key; gene, diplotype and drug never contain "-"
+    return tuple(key.split("-", 2))
+
+
+def store_version(rules=None):
+    # Any change to the tables that shape the key space invalidates the store
+    rules = rules or current_rules()
+    payload = json.dumps(
+        [PROMPT_VERSION, rules.star_alleles, rules.drug_rules], sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+# ─────────────────────────────────────────────
+# Key space enumeration
+# ─────────────────────────────────────────────
+def reachable_diplotypes(gene: str, rules=None):
+    """Every diplotype determine_star can return for ``gene``."""
+
+    rules = rules or current_rules()
+    stars = list(dict.fromkeys(rules.star_alleles.get(gene, {}).values()))
+
+    diplotypes = ["*1/*1"]
+    diplotypes += [f"*1/{star}" for star in stars]
+    diplotypes += [f"{star}/{star}" for star in stars]
+    # Compound heterozygotes keep detection order, so both orders occur
+    diplotypes += [f"{a}/{b}" for a, b in permutations(stars, 2)]
+
+    return diplotypes
+
+
+def describe_combination(gene: str, diplotype: str, drug: str, rules=None):
+    """The prompt inputs for one key, derived from the rules alone."""
+
+    rules = rules or current_rules()
+
+    star_to_rsids = {}
+    for rsid, star in rules.star_alleles.get(gene, {}).items():
+        star_to_rsids.setdefault(star, []).append(rsid)
+
+    phenotype = determine_phenotype(gene, diplotype, rules)
+    rsids = [
+        rsid
+        for star in dict.fromkeys(diplotype.split("/"))
+        for rsid in star_to_rsids.get(star, [])
+    ]
+
+    return {
+        "gene": gene,
+        "diplotype": diplotype,
+        "phenotype": phenotype,
+        "drug": drug,
+        "risk": assess_risk(drug, phenotype, rules)["risk"],
+        "variants": rsids
+    }
+
+
+def enumerate_combinations(rules=None):
+    rules = rules or current_rules()
+
+    for drug, rule in rules.drug_rules.items():
+        gene = rule["gene"]
+        for diplotype in reachable_diplotypes(gene, rules):
+            yield describe_combination(gene, diplotype, drug, rules)
+
+
+# ─────────────────────────────────────────────
+# Load / build
+# ─────────────────────────────────────────────
+def load_store(path: str = STORE_PATH):
+    """Return the store's entries, or {} if it is missing or out of date."""
+
+    try:
+        with open(path, encoding="utf-8") as handle:
+            store = json.load(handle)
+    except FileNotFoundError:
+        return {}
+    except ValueError as exc:
+        # A truncated or corrupt store must not stop the API from booting
+        logger.error("Ignoring unreadable mechanism store %s: %s", path, exc)
+        return {}
+
+    if store.get("version") != store_version():
+        logger.warning(
+            "Ignoring mechanism store %s: version %s does not match rules %s",
+            path, store.get("version"), store_version()
+        )
+        return {}
+
+    return store.get("entries", {})
+
+
+def build_store(path: str = STORE_PATH, workers: int = 4, force: bool = False):
+    from llm_service import generate_mechanism, llm_enabled
+
+    if not llm_enabled():
+        raise ValueError("Building the store needs an LLM; LLM_PROVIDER is none.")
+
+    entries = {} if force else load_store(path)
+    pending = [
+        combo for combo in enumerate_combinations()
+        if mechanism_key(combo["gene"], combo["diplotype"], combo["drug"]) not in entries
+    ]
+
+    logger.info("%d cached, %d to generate", len(entries), len(pending))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                generate_mechanism,
+                combo["gene"],
+                combo["diplotype"],
+                combo["phenotype"],
+                combo["drug"],
+                combo["risk"],
+                combo["variants"]
+            ): combo
+            for combo in pending
+        }
+
+        for future in as_completed(futures):
+            combo = futures[future]
+            key = mechanism_key(combo["gene"], combo["diplotype"], combo["drug"])
+            try:
+                entries[key] = future.result()
+            except Exception as exc:
+                logger.error("Failed to generate %s: %s", key, exc)
+
+    store = {
+        "version": store_version(),
+        "generated_at": datetime.utcnow().isoformat(),
+        "entries": dict(sorted(entries.items()))
+    }
+
+    # Write-then-rename so a running server never reads a partial file, via a
+    # unique temp file so concurrent builds never interleave
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, prefix=f"{os.path.basename(path)}.",
+        suffix=".tmp", delete=False
+    ) as handle:
+        json.dump(store, handle, indent=2)
+    os.replace(handle.name, path)
+
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=STORE_PATH)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate entries already present in the store")
+    parser.add_argument("--list", action="store_true",
+                        help="only print the combinations that would be generated")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.list:
+        for combo in enumerate_combinations():
+            print(mechanism_key(combo["gene"], combo["diplotype"], combo["drug"]))
+        return
+
+    store = build_store(args.out, args.workers, args.force)
+    logger.info("Wrote %d entries to %s", len(store["entries"]), args.out)
+
+
+if __name__ == "__main__":
+    main()
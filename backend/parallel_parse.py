@@ -0,0 +1,163 @@
+"""Process-pool parsing of large plain-text VCFs.
+
+The GIL serialises the byte-level prefilter when it runs in threads, so
+large files are split into line-aligned byte ranges that worker processes
+scan in parallel straight from disk (mmap). Each worker returns only the
+raw lines that hit a PGx target, one ``bytes`` object per range, so IPC
+carries a few KB instead of parsed records. The parent then decodes those
+lines in file order through the normal VCFStreamParser.
+"""
+
+import mmap
+import os
+import shutil
+import tempfile
+
+from rules_store import current_rules
+from vcf_parser import VCFStreamParser, block_target_loci, filter_target_lines
+
+
+# ─────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", str(os.cpu_count() or 1)))
+
+# Smaller files are parsed in-process; pool dispatch would cost more than it saves
+PARALLEL_PARSE_MIN_BYTES = int(
+    os.getenv("PARALLEL_PARSE_MIN_BYTES", str(64 * 1024 * 1024))
+)
+
+# Each worker scans its range this many bytes at a time to bound memory
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+
+_pool = None
+
+
+def parse_pool():
+    global _pool
+
+    if _pool is None:
+        # multiprocessing is only loaded once a large upload needs it
+        from concurrent.futures import ProcessPoolExecutor
+        _pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES)
+
+    return _pool
+
+
+def use_parallel_parse(size: int):
+    return PARSE_PROCESSES > 1 and size >= PARALLEL_PARSE_MIN_BYTES
+
+
+# ─────────────────────────────────────────────
+# Range splitting
+# ─────────────────────────────────────────────
+def _line_start(buffer, offset: int):
+    # First line starting at or after ``offset``
+    if offset <= 0:
+        return 0
+
+    newline = buffer.find(b"\n", offset - 1)
+    return len(buffer) if newline == -1 else newline + 1
+
+
+def _header_end(buffer):
+    offset = 0
+
+    while offset < len(buffer) and buffer[offset:offset + 1] == b"#":
+        offset = _line_start(buffer, offset + 1)
+
+    return offset
+
+
+def split_ranges(buffer, start: int, parts: int):
+    """Split ``buffer[start:]`` into ``parts`` line-aligned (start, end) ranges."""
+
+    size = len(buffer) - start
+    bounds = [start]
+    bounds += [_line_start(buffer, start + size * i // parts) for i in range(1, parts)]
+    bounds.append(len(buffer))
+
+    return [(beg, end) for beg, end in zip(bounds, bounds[1:]) if end > beg]
+
+
+# ─────────────────────────────────────────────
+# Worker
+# ─────────────────────────────────────────────
+def scan_range(path: str, start: int, end: int, rsids: frozenset, loci: frozenset,
+               genes: frozenset):
+    """Return the target lines in ``[start, end)`` of ``path``, newline-joined."""
+
+    hits = []
+
+    with open(path, "rb") as handle, \
+            mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        offset = start
+
+        while offset < end:
+            block_end = min(_line_start(buffer, offset + SCAN_BLOCK_SIZE), end)
+            block = buffer[offset:block_end]
+            hits += filter_target_lines(
+                block.split(b"\n"), rsids, block_target_loci(block, loci, genes)
+            )
+            offset = block_end
+
+    return b"\n".join(hits)
+
+
+# ─────────────────────────────────────────────
+# Parallel parse
+# ─────────────────────────────────────────────
+def parse_vcf_path_parallel(path: str, rules=None, processes: int = None):
+    """Parse a plain-text VCF on disk across the process pool."""
+
+    rules = rules or current_rules()
+    processes = processes or PARSE_PROCESSES
+    parser = VCFStreamParser(rules=rules)
+
+    with open(path, "rb") as handle, \
+            mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        data_start = _header_end(buffer)
+        parser.feed(buffer[:data_start])
+        ranges = split_ranges(buffer, data_start, processes)
+
+    if len(ranges) <= 1:
+        # Not worth a pool round-trip: scan the mapped file in this process
+        for start, end in ranges:
+            parser.feed(scan_range(
+                path, start, end, rules.target_rsids_bytes, rules.target_loci_bytes,
+                rules.target_genes_bytes
+            ) + b"\n")
+        return parser.close()
+
+    futures = [
+        parse_pool().submit(
+            scan_range, path, start, end,
+            rules.target_rsids_bytes, rules.target_loci_bytes, rules.target_genes_bytes
+        )
+        for start, end in ranges
+    ]
+
+    # Ranges are merged in file order, so the table matches a sequential parse
+    for future in futures:
+        hits = future.result()
+        if hits:
+            parser.feed(hits + b"\n")
+
+    return parser.close()
+
+
+def parse_vcf_fileobj_parallel(fileobj, rules=None):
+    """Spool an upload to a temp file the workers can map, then parse it."""
+
+    with tempfile.NamedTemporaryFile(suffix=".vcf") as spool:
+        fileobj.seek(0)
+        shutil.copyfileobj(fileobj, spool, 1024 * 1024)
+        spool.flush()
+        return parse_vcf_path_parallel(spool.name, rules)
+
+
+def parse_vcf_path(path: str, rules=None):
+    """Parse a plain-text VCF on disk via mmap, in parallel when it is large."""
+
+    processes = PARSE_PROCESSES if use_parallel_parse(os.path.getsize(path)) else 1
+    return parse_vcf_path_parallel(path, rules, processes)
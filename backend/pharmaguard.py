@@ -0,0 +1,175 @@
+"""Local-file analysis without the HTTP stack.
+
+Library:
+
+    from pharmaguard import analyze_file
+    report = analyze_file("patient.vcf", ["CLOPIDOGREL", "WARFARIN"])
+
+CLI (from backend/):
+
+    python -m pharmaguard analyze patient.vcf --drugs CLOPIDOGREL,WARFARIN
+    python -m pharmaguard analyze cohort/*.vcf.gz --drugs CODEINE --format tsv
+"""
+
+import argparse
+import csv
+import json
+import sys
+
+from analysis import evaluate_panel, parse_drug_list
+from batch import COMPRESSED_EXTENSIONS
+from bgzf import read_index
+from parallel_parse import parse_vcf_path
+from rules_store import current_rules
+from vcf_parser import parse_indexed_vcf, parse_vcf_fileobj
+
+
+# ─────────────────────────────────────────────
+# Library API
+# ─────────────────────────────────────────────
+def load_variants(path: str, index_path: str = None, rules=None):
+    """Parse the PGx variants of a local VCF into a VariantTable.
+
+    Plain-text files are memory-mapped and only lines whose CHROM/POS/ID hit
+    a target are decoded; large ones are scanned across the process pool.
+    Compressed files are streamed, or region-fetched when an index is given.
+    """
+
+    rules = rules or current_rules()
+
+    if index_path is not None:
+        with open(index_path, "rb") as handle:
+            index = read_index(handle.read())
+        with open(path, "rb") as handle:
+            return parse_indexed_vcf(handle, index, rules=rules)
+
+    if path.endswith(COMPRESSED_EXTENSIONS):
+        with open(path, "rb") as handle:
+            return parse_vcf_fileobj(handle, compressed=True, rules=rules)
+
+    return parse_vcf_path(path, rules)
+
+
+def explain(evaluations: list):
+    """Fill in biological_mechanism from the shared cache, calling the LLM on a miss."""
+
+    from llm_service import RULES_ONLY_MECHANISM, generate_mechanism, llm_enabled
+    from mechanism_cache import build_cache
+    from mechanism_store import load_store
+
+    cache = build_cache(store=load_store())
+
+    for evaluation in evaluations:
+        mechanism = cache.get(evaluation.cache_key)
+        if mechanism is None and not llm_enabled():
+            mechanism = RULES_ONLY_MECHANISM
+        elif mechanism is None:
+            mechanism = generate_mechanism(*evaluation.llm_args)
+            cache.set(evaluation.cache_key, mechanism)
+
+        evaluation.result["llm_explanation"]["biological_mechanism"] = mechanism
+
+
+def analyze_file(path: str, drugs, index_path: str = None,
+                 with_explanations: bool = False, rules=None):
+    """Run the /analyze pipeline on a local file; returns the same response shape."""
+
+    rules = rules or current_rules()
+    drug_list = parse_drug_list(drugs) if isinstance(drugs, str) else list(drugs)
+
+    variant_table = load_variants(path, index_path, rules)
+    if not len(variant_table):
+        raise ValueError("VCF file parsed but no pharmacogenomic variants detected.")
+
+    evaluations = evaluate_panel(variant_table, drug_list, rules)
+
+    if with_explanations:
+        explain(evaluations)
+
+    return {
+        "samples": variant_table.samples,
+        "results": [evaluation.result for evaluation in evaluations]
+    }
+
+
+# ─────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────
+TSV_COLUMNS = (
+    "file", "patient_id", "drug", "gene", "diplotype", "phenotype",
+    "activity_score", "risk", "severity", "confidence"
+)
+
+
+def tsv_rows(path: str, report: dict):
+    for result in report["results"]:
+        profile = result["pharmacogenomic_profile"]
+        risk = result["risk_assessment"]
+        yield (
+            path,
+            result["patient_id"],
+            result["drug"],
+            profile["primary_gene"],
+            profile["diplotype"],
+            profile["phenotype"],
+            profile["activity_score"],
+            risk["risk_label"],
+            risk["severity"],
+            risk["confidence_score"]
+        )
+
+
+def run_analyze(args):
+    rules = current_rules()
+    drug_list = parse_drug_list(args.drugs)
+
+    if args.index and len(args.paths) != 1:
+        sys.exit("--index can only be used with a single VCF.")
+
+    writer = None
+    if args.format == "tsv":
+        writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+        writer.writerow(TSV_COLUMNS)
+
+    failed = 0
+
+    for path in args.paths:
+        try:
+            report = analyze_file(
+                path, drug_list, args.index, args.explain, rules
+            )
+        except (OSError, ValueError) as exc:
+            print(f"{path}: {exc}", file=sys.stderr)
+            failed += 1
+            continue
+
+        if writer:
+            writer.writerows(tsv_rows(path, report))
+        else:
+            # One JSON document per file; one per line unless --indent is set
+            print(json.dumps({"file": path, **report}, indent=args.indent))
+
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pharmaguard", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="analyze local VCF files")
+    analyze.add_argument("paths", nargs="+", metavar="path.vcf")
+    analyze.add_argument("--drugs", required=True, help="comma-separated drug names")
+    analyze.add_argument("--index", help="tabix/CSI index for a single .vcf.gz")
+    analyze.add_argument("--explain", action="store_true",
+                         help="also fetch LLM mechanism explanations (cached)")
+    analyze.add_argument("--format", choices=("json", "tsv"), default="json")
+    analyze.add_argument("--indent", type=int, default=None,
+                         help="pretty-print JSON output")
+    analyze.set_defaults(handler=run_analyze)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
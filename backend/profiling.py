@@ -0,0 +1,172 @@
+"""Opt-in cProfile capture of a single request.
+
+``profile_request()`` puts a RequestProfile in a context variable for the
+duration of one request. Synchronous work passed through ``profiled(func)``
+(threadpool decode, parse and rule evaluation) runs under its own
+cProfile.Profile, and the pieces are merged into one pstats file.
+Event-loop scheduling is not profiled, so concurrent requests never leak
+into the trace. Awaited I/O such as LLM calls is only timed, through
+``record_wait``, and listed in the text summary. Unprofiled requests pay
+one context-variable lookup per wrapped call.
+
+Stored profiles load with ``pstats`` and render as flame graphs with
+tools such as snakeviz, tuna or flameprof.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from pathlib import Path
+
+
+# ─────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(Path(__file__).parent / "profiles"))
+
+# Most recent profiles kept on disk
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+
+PROFILE_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+SUMMARY_LINES = 40
+
+# Python 3.12+ allows one active cProfile per interpreter, so profiled
+# calls run one at a time (only profiled requests ever take this lock)
+_profiler_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────
+# Per-request profile
+# ─────────────────────────────────────────────
+class RequestProfile:
+
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.started = time.perf_counter()
+        self.wall_time = None
+        self._profiles = []
+        self._waits = {}
+        self._lock = threading.Lock()
+
+    def call(self, func, *args, **kwargs):
+        # Work still running when the request finished is not traced, nor is
+        # work on the event loop, which must never wait on the profiler lock
+        if self.wall_time is not None or on_event_loop():
+            return func(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        with _profiler_lock:
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._profiles.append(profile)
+
+    def record_wait(self, name: str, seconds: float):
+        with self._lock:
+            count, total = self._waits.get(name, (0, 0.0))
+            self._waits[name] = (count + 1, total + seconds)
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self.started
+
+    def stats(self):
+        with self._lock:
+            profiles = list(self._profiles) or [cProfile.Profile()]
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def summary(self, stats: pstats.Stats):
+        out = io.StringIO()
+        out.write(f"{self.label}\n")
+        out.write(f"wall time {self.wall_time * 1000:.1f} ms, "
+                  f"profiled {stats.total_tt * 1000:.1f} ms "
+                  f"across {len(self._profiles)} calls\n")
+        for name, (count, total) in sorted(self._waits.items()):
+            out.write(f"awaited {name}: {count} calls, {total * 1000:.1f} ms total (not traced)\n")
+
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+        return out.getvalue()
+
+    def save(self, root: str = PROFILE_DIR):
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+
+        stats = self.stats()
+        stats.dump_stats(root / f"{self.id}.prof")
+        (root / f"{self.id}.txt").write_text(self.summary(stats), encoding="utf-8")
+
+        prune_profiles(root)
+
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def profiling_active():
+    # Tasks spawned by a profiled request (e.g. deferred prefetch) inherit
+    # its context but outlive it
+    profile = current_profile.get()
+    return profile is not None and profile.wall_time is None
+
+
+def profiled(func):
+    """Return ``func`` bound to the active request profile, or unchanged."""
+
+    if not profiling_active():
+        return func
+    return partial(current_profile.get().call, func)
+
+
+@contextmanager
+def profile_request(label: str):
+    profile = RequestProfile(label)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+        profile.finish()
+
+
+# ─────────────────────────────────────────────
+# Stored profiles
+# ─────────────────────────────────────────────
+def profile_path(profile_id: str, suffix: str, root: str = PROFILE_DIR):
+    """Path of a stored profile (".prof" or ".txt"), or None if unknown."""
+
+    if not PROFILE_ID_PATTERN.fullmatch(profile_id):
+        return None
+
+    path = Path(root) / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+def prune_profiles(root: Path, keep: int = PROFILE_KEEP):
+    stored = sorted(root.glob("*.prof"), key=lambda path: path.stat().st_mtime)
+
+    for path in stored[:max(len(stored) - keep, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".txt").unlink(missing_ok=True)
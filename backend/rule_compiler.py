@@ -0,0 +1,157 @@
+from itertools import combinations_with_replacement
+
+
+# ─────────────────────────────────────────────
+# Rule evaluation (slow path, used at compile time)
+# ─────────────────────────────────────────────
+def canonical_alleles(diplotype: str):
+    try:
+        allele1, allele2 = diplotype.split("/")
+    except (AttributeError, ValueError):
+        return None
+
+    return tuple(sorted([allele1.strip(), allele2.strip()]))
+
+
+def evaluate_phenotype_rules(gene_rules: dict, alleles: tuple):
+
+    for rule in gene_rules.get("rules", []):
+
+        phenotype = rule["phenotype"]
+
+        if any(canonical_alleles(d) == alleles for d in rule.get("diplotypes", [])):
+            return phenotype
+
+        if any(a in rule.get("any_allele", []) for a in alleles):
+            return phenotype
+
+        prefixes = tuple(rule.get("any_allele_prefix", []))
+        if prefixes and any(a.startswith(prefixes) for a in alleles):
+            return phenotype
+
+        # Both alleles drawn from one set, e.g. two no-function alleles
+        members = rule.get("all_alleles", [])
+        member_prefixes = tuple(rule.get("all_alleles_prefix", []))
+        if (members or member_prefixes) and all(
+            a in members or a.startswith(member_prefixes) for a in alleles
+        ):
+            return phenotype
+
+    return gene_rules.get("default", "Unknown")
+
+
+def score_diplotype(allele_table: dict, diplotype: str):
+    try:
+        allele1, allele2 = diplotype.split("/")
+    except ValueError:
+        return 1.0
+
+    return round(allele_table.get(allele1, 1.0) + allele_table.get(allele2, 1.0), 2)
+
+
+# ─────────────────────────────────────────────
+# Compiled Rule Set
+# ─────────────────────────────────────────────
+class CompiledRules:
+    """Gene/drug rule tables precompiled into flat lookups.
+
+    Every diplotype that can be formed from a gene's known alleles is
+    evaluated once at compile time and stored under its literal string in
+    both allele orders, so the hot path is a single dict index without
+    splitting or sorting. Unseen diplotypes fall back to rule evaluation.
+    """
+
+    def __init__(self, star_maps: dict, phenotype_rules: dict,
+                 allele_scores: dict, drug_rules: dict):
+        self.star_maps = star_maps
+        self.phenotype_rules = phenotype_rules
+        self.allele_scores = allele_scores
+        self.drug_rules = drug_rules
+
+        self.alleles = self._collect_alleles()
+        self.phenotypes = self._compile_phenotypes()
+        self.activity_scores = self._compile_activity_scores()
+        self.risks = self._compile_risks()
+
+    def _collect_alleles(self):
+        alleles = {}
+
+        for gene in {*self.star_maps, *self.phenotype_rules, *self.allele_scores}:
+            known = {"*1"}
+            known.update(self.star_maps.get(gene, {}).values())
+            known.update(self.allele_scores.get(gene, {}))
+
+            for rule in self.phenotype_rules.get(gene, {}).get("rules", []):
+                known.update(rule.get("any_allele", []))
+                known.update(rule.get("all_alleles", []))
+                for diplotype in rule.get("diplotypes", []):
+                    known.update(canonical_alleles(diplotype) or ())
+
+            alleles[gene] = sorted(known)
+
+        return alleles
+
+    def _diplotypes(self, gene: str):
+        for allele1, allele2 in combinations_with_replacement(self.alleles[gene], 2):
+            yield (allele1, allele2), f"{allele1}/{allele2}", f"{allele2}/{allele1}"
+
+    def _compile_phenotypes(self):
+        tables = {}
+
+        for gene, gene_rules in self.phenotype_rules.items():
+            table = tables[gene] = {}
+            for alleles, forward, reverse in self._diplotypes(gene):
+                phenotype = evaluate_phenotype_rules(gene_rules, alleles)
+                table[forward] = table[reverse] = phenotype
+
+        return tables
+
+    def _compile_activity_scores(self):
+        tables = {}
+
+        for gene, allele_table in self.allele_scores.items():
+            table = tables[gene] = {}
+            for _, forward, reverse in self._diplotypes(gene):
+                table[forward] = score_diplotype(allele_table, forward)
+                table[reverse] = score_diplotype(allele_table, reverse)
+
+        return tables
+
+    def _compile_risks(self):
+        return {
+            (drug, phenotype): phenotype_data
+            for drug, rule in self.drug_rules.items()
+            for phenotype, phenotype_data in rule["phenotypes"].items()
+        }
+
+    # ── Lookups ──────────────────────────────
+
+    def phenotype(self, gene: str, diplotype: str):
+        table = self.phenotypes.get(gene)
+        if table is None:
+            return "Unknown"
+
+        phenotype = table.get(diplotype)
+        if phenotype is not None:
+            return phenotype
+
+        alleles = canonical_alleles(diplotype)
+        if alleles is None:
+            return "Unknown"
+
+        return evaluate_phenotype_rules(self.phenotype_rules[gene], alleles)
+
+    def activity_score(self, gene: str, diplotype: str):
+        table = self.activity_scores.get(gene)
+        if table is None:
+            return 1.0  # default safe fallback
+
+        score = table.get(diplotype)
+        if score is not None:
+            return score
+
+        return score_diplotype(self.allele_scores[gene], diplotype)
+
+
+def compile_rules(star_maps, phenotype_rules, allele_scores, drug_rules):
+    return CompiledRules(star_maps, phenotype_rules, allele_scores, drug_rules)
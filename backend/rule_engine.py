@@ -1,78 +1,33 @@
-from mappings import VARIANT_TO_STAR, DIPLOTYPE_TO_PHENOTYPE, DRUG_RULES
+from functools import lru_cache
+
+from genotype import ZYGOSITY_LABELS, decode_genotype
+from rules_store import rules_store, current_rules
 
 
 # ─────────────────────────────────────────────
 # Determine Zygosity from genotype
 # ─────────────────────────────────────────────
 def determine_zygosity(genotype: str):
-
-    if not genotype:
-        return "Unknown"
-
-    # Remove extra FORMAT info if present (e.g. GT:DP:GQ)
-    genotype = genotype.split(":")[0]
-
-    # Normalize separators
-    genotype = genotype.replace("|", "/")
-
-    alleles = genotype.split("/")
-
-    # Missing genotype
-    if "." in alleles:
-        return "Unknown"
-
-    # Homozygous reference
-    if alleles[0] == alleles[1] == "0":
-        return "Homozygous Reference"
-
-    # Homozygous alternate (any non-zero identical)
-    if alleles[0] == alleles[1] and alleles[0] != "0":
-        return "Homozygous"
-
-    # Heterozygous (one ref + one alt OR two different alts)
-    if alleles[0] != alleles[1]:
-        return "Heterozygous"
-
-    return "Unknown"
+    return ZYGOSITY_LABELS[decode_genotype(genotype)[3]]
 
 # ─────────────────────────────────────────────
 # Determine Star Alleles (Diplotype)
 # ─────────────────────────────────────────────
-# ───────────────────────────────────────────────
-# Variant to Star Allele Mapping
-# ───────────────────────────────────────────────
-
-VARIANT_STAR_MAP = {
-
-    "CYP2C19": {
-        "rs4244285": "*2",
-        "rs4986893": "*3",
-        "rs12248560": "*17"
-    },
-
-    "CYP2C9": {
-        "rs1799853": "*2",
-        "rs1057910": "*3"
-    },
-
-    "CYP2D6": {
-        "rs3892097": "*4",
-        "rs1065852": "*10"
-    }
+def determine_star(gene: str, variants: list, rules=None):
 
-}
-def determine_star(gene: str, variants: list):
+    rules = rules or current_rules()
 
-    if gene not in VARIANT_STAR_MAP:
+    if gene not in rules.star_alleles:
         return "*1/*1"
 
-    star_map = VARIANT_STAR_MAP[gene]
+    star_map = rules.star_alleles[gene]
 
     detected_stars = []
 
     for v in variants:
         rsid = v.get("rsid")
-        zygosity = determine_zygosity(v.get("genotype"))
+        # Reuse the batch-decoded zygosity when the variant carries it
+        zygosity = v.get("zygosity") or determine_zygosity(v.get("genotype"))
 
         if rsid in star_map:
 
@@ -98,145 +53,28 @@ def determine_star(gene: str, variants: list):
 # ─────────────────────────────────────────────
 ALLOWED_PHENOTYPES = ["PM", "IM", "NM", "RM", "URM", "Unknown"]
 
-def determine_phenotype(gene: str, diplotype: str):
+def determine_phenotype(gene: str, diplotype: str, rules=None):
 
     if not gene or not diplotype:
         return "Unknown"
 
-    gene = gene.upper()
-
-    # Normalize diplotype safely
-    try:
-        allele1, allele2 = diplotype.split("/")
-        alleles = sorted([allele1.strip(), allele2.strip()])
-    except Exception:
-        return "Unknown"
-
-    # ───────────────── CYP2D6 ─────────────────
-    if gene == "CYP2D6":
-
-        if alleles == ["*4", "*4"]:
-            return "PM"
-
-        if "*4" in alleles:
-            return "IM"
-
-        return "NM"
-
-    # ───────────────── CYP2C19 ─────────────────
-    if gene == "CYP2C19":
-
-        if alleles in [["*2", "*2"], ["*3", "*3"]]:
-            return "PM"
-
-        if "*2" in alleles or "*3" in alleles:
-            return "IM"
-
-        return "NM"
-
-    # ───────────────── CYP2C9 ─────────────────
-    if gene == "CYP2C9":
-
-        if alleles == ["*3", "*3"]:
-            return "PM"
-
-        if "*2" in alleles or "*3" in alleles:
-            return "IM"
-
-        return "NM"
-
-    # ───────────────── SLCO1B1 ─────────────────
-    if gene == "SLCO1B1":
-
-        if alleles == ["*5", "*5"]:
-            return "PM"
-
-        if "*5" in alleles:
-            return "IM"
-
-        return "NM"
-
-    # ───────────────── TPMT ─────────────────
-    if gene == "TPMT":
-
-        if alleles == ["*2", "*2"] or any(a.startswith("*3") for a in alleles):
-            return "PM"
-
-        if "*2" in alleles:
-            return "IM"
-
-        return "NM"
-
-    # ───────────────── DPYD ─────────────────
-    if gene == "DPYD":
-
-        if alleles == ["*2A", "*2A"]:
-            return "PM"
-
-        if "*2A" in alleles:
-            return "IM"
-
-        return "NM"
-
-    return "Unknown"
+    return (rules or current_rules()).compiled.phenotype(gene.upper(), diplotype)
 
 # ─────────────────────────────────────────────
 # Activity Score Calculation
 # ─────────────────────────────────────────────
 
-# ───────────────────────────────────────────────
-# CPIC Allele Activity Score Tables
-# ───────────────────────────────────────────────
-
-ALLELE_SCORES = {
-
-    "CYP2C19": {
-        "*1": 1.0,
-        "*2": 0.0,
-        "*3": 0.0,
-        "*17": 1.5
-    },
-
-    "CYP2C9": {
-        "*1": 1.0,
-        "*2": 0.5,
-        "*3": 0.0
-    },
-
-    "CYP2D6": {
-        "*1": 1.0,
-        "*2": 1.0,
-        "*4": 0.0,
-        "*5": 0.0,
-        "*10": 0.25
-    }
-
-}
-
-def calculate_activity_score(gene: str, diplotype: str) -> float:
-
-    if gene not in ALLELE_SCORES:
-        return 1.0  # default safe fallback
-
-    allele_table = ALLELE_SCORES[gene]
-
-    try:
-        allele1, allele2 = diplotype.split("/")
-    except ValueError:
-        return 1.0
-
-    score1 = allele_table.get(allele1, 1.0)
-    score2 = allele_table.get(allele2, 1.0)
-
-    return round(score1 + score2, 2)
+def calculate_activity_score(gene: str, diplotype: str, rules=None) -> float:
+    return (rules or current_rules()).compiled.activity_score(gene, diplotype)
 
 # ─────────────────────────────────────────────
 # Risk Assessment
 # ─────────────────────────────────────────────
 ALLOWED_SEVERITIES = ["none", "low", "moderate", "high", "critical"]
 
-def assess_risk(drug: str, phenotype: str):
-    rule = DRUG_RULES.get(drug)
+def assess_risk(drug: str, phenotype: str, rules=None):
+    rules = rules or current_rules()
+    rule = rules.drug_rules.get(drug)
 
     if not rule:
         return {
@@ -245,7 +83,7 @@ def assess_risk(drug: str, phenotype: str):
             "recommendation": "No clinical guideline available for this drug."
         }
 
-    phenotype_data = rule["phenotypes"].get(phenotype)
+    phenotype_data = rules.compiled.risks.get((drug, phenotype))
 
     if not phenotype_data:
         return {
@@ -277,7 +115,8 @@ def calculate_confidence(
     diplotype: str,
     phenotype: str,
     drug: str,
-    variants: list
+    variants: list,
+    rules=None
 ) -> float:
 
     # 1️⃣ Variant Strength
@@ -299,9 +138,7 @@ def calculate_confidence(
         diplotype_certainty = 1.0
 
     # 4️⃣ Rule Match Score
-    from mappings import DRUG_RULES
-
-    if drug in DRUG_RULES:
+    if drug in (rules or current_rules()).drug_rules:
         rule_match_score = 1.0
     else:
         rule_match_score = 0.5
@@ -327,27 +164,51 @@ def calculate_confidence(
 
     return round(confidence, 2)
 
-ALTERNATIVE_DRUGS = {
+def get_alternative_drugs(drug: str, phenotype: str, rules=None):
 
-    "CLOPIDOGREL": {
-        "PM": ["PRASUGREL", "TICAGRELOR"],
-        "IM": ["PRASUGREL", "TICAGRELOR"]
-    },
+    alternative_drugs = (rules or current_rules()).alternative_drugs
 
-    "CODEINE": {
-        "PM": ["MORPHINE", "HYDROMORPHONE"],
-        "UM": ["MORPHINE", "HYDROMORPHONE"]
-    },
+    if drug not in alternative_drugs:
+        return []
 
-    "WARFARIN": {
-        "PM": ["APIXABAN", "RIVAROXABAN"],
-        "IM": []
-    }
+    return alternative_drugs[drug].get(phenotype, [])
 
-}
-def get_alternative_drugs(drug: str, phenotype: str):
 
-    if drug not in ALTERNATIVE_DRUGS:
-        return []
+# ─────────────────────────────────────────────
+# Gene Profile (memoized on genotype signature)
+# ─────────────────────────────────────────────
+GENE_PROFILE_CACHE_SIZE = 4096
+
+
+def genotype_signature(gene: str, variants: list, rules=None):
+    # Only star-defining calls affect the diplotype; order is kept because
+    # determine_star reports compound heterozygotes in detection order
+    star_map = (rules or current_rules()).star_alleles.get(gene, {})
+
+    return tuple(
+        (v.get("rsid"), v.get("zygosity") or determine_zygosity(v.get("genotype")))
+        for v in variants
+        if v.get("rsid") in star_map
+    )
+
+
+@lru_cache(maxsize=GENE_PROFILE_CACHE_SIZE)
+def _gene_profile(rules, gene: str, signature: tuple):
+    variants = [{"rsid": rsid, "zygosity": zygosity} for rsid, zygosity in signature]
+
+    diplotype = determine_star(gene, variants, rules)
+    activity_score = calculate_activity_score(gene, diplotype, rules)
+    phenotype = determine_phenotype(gene, diplotype, rules)
+
+    return diplotype, activity_score, phenotype
+
+
+def determine_gene_profile(gene: str, variants: list, rules=None):
+    """Return (diplotype, activity_score, phenotype), shared by identical genotypes."""
+
+    rules = rules or current_rules()
+    return _gene_profile(rules, gene, genotype_signature(gene, variants, rules))
+
 
-    return ALTERNATIVE_DRUGS[drug].get(phenotype, [])
+# Profiles are keyed on the rule set; clearing on reload just frees stale entries
+rules_store.on_change(lambda *_: _gene_profile.cache_clear())
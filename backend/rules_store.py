@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from rule_compiler import compile_rules
+
+
+# ─────────────────────────────────────────────
+# Configuration
+# ─────────────────────────────────────────────
+RULES_PATH = os.getenv(
+    "RULES_PATH",
+    str(Path(__file__).parent / "rules" / "pharmaguard-rules.json")
+)
+
+# Rule sets activated through publish() are written here, outside the source
+# tree, and take precedence over RULES_PATH while the file exists
+PUBLISHED_RULES_PATH = os.getenv(
+    "PUBLISHED_RULES_PATH",
+    str(Path(__file__).parent / "published_rules" / "pharmaguard-rules.json")
+)
+
+# Padding (bp) around each gene's known loci when seeking with an index
+PGX_REGION_PADDING = 10_000
+
+REQUIRED_SECTIONS = (
+    "version",
+    "star_alleles",
+    "variant_loci",
+    "phenotype_rules",
+    "allele_scores",
+    "drug_rules",
+    "alternative_drugs",
+)
+
+# Sections keyed by gene / by drug, used to work out what a reload touched
+GENE_SECTIONS = ("star_alleles", "variant_loci", "phenotype_rules", "allele_scores")
+DRUG_SECTIONS = ("drug_rules", "alternative_drugs")
+
+
+# ─────────────────────────────────────────────
+# Rule Set
+# ─────────────────────────────────────────────
+class RuleSet:
+    """One immutable, versioned set of guideline tables plus compiled lookups."""
+
+    def __init__(self, data: dict, source: str = None):
+        missing = [section for section in REQUIRED_SECTIONS if section not in data]
+        if missing:
+            raise ValueError(f"Rule set is missing sections: {', '.join(missing)}")
+
+        self.data = data
+        self.source = source
+        self.version = str(data["version"])
+        self.fingerprint = hashlib.sha256(
+            json.dumps(data, sort_keys=True).encode()
+        ).hexdigest()[:16]
+
+        self.star_alleles = data["star_alleles"]
+        self.variant_loci = {
+            gene: {rsid: (str(chrom), int(pos)) for rsid, (chrom, pos) in loci.items()}
+            for gene, loci in data["variant_loci"].items()
+        }
+        self.phenotype_rules = data["phenotype_rules"]
+        self.allele_scores = data["allele_scores"]
+        self.drug_rules = data["drug_rules"]
+        self.alternative_drugs = data["alternative_drugs"]
+
+        for drug, rule in self.drug_rules.items():
+            if "gene" not in rule or "phenotypes" not in rule:
+                raise ValueError(f"Drug rule {drug} needs 'gene' and 'phenotypes'.")
+
+        self.compiled = compile_rules(
+            self.star_alleles,
+            self.phenotype_rules,
+            self.allele_scores,
+            self.drug_rules
+        )
+        self._check_phenotypes(data.get("phenotype_checks", {}))
+        self._build_target_index()
+
+    def _check_phenotypes(self, checks: dict):
+        # Known diplotype calls a rule edit must not change
+        for gene, expected in checks.items():
+            for diplotype, phenotype in expected.items():
+                called = self.compiled.phenotype(gene, diplotype)
+                if called != phenotype:
+                    raise ValueError(
+                        f"Phenotype check failed: {gene} {diplotype} is {called}, "
+                        f"expected {phenotype}."
+                    )
+
+    def _build_target_index(self):
+        self.target_rsids = frozenset(
+            rsid for star_map in self.star_alleles.values() for rsid in star_map
+        )
+
+        # (chrom, pos) as they appear in a file, with and without "chr"
+        self.target_loci = frozenset(
+            (prefix + chrom, str(pos))
+            for loci in self.variant_loci.values()
+            for chrom, pos in loci.values()
+            for prefix in ("", "chr")
+        )
+
+        # Records annotated INFO GENE=<panel gene> are kept whatever their rsID
+        self.target_genes = frozenset(self.star_alleles) | frozenset(
+            rule["gene"] for rule in self.drug_rules.values()
+        )
+
+        self.target_rsids_bytes = frozenset(rsid.encode() for rsid in self.target_rsids)
+        self.target_genes_bytes = frozenset(gene.encode() for gene in self.target_genes)
+        self.target_loci_bytes = frozenset(
+            (chrom.encode(), pos.encode()) for chrom, pos in self.target_loci
+        )
+
+        # (chrom, beg, end) 0-based half-open regions covering the pharmacogenes
+        self.regions = []
+        for loci in self.variant_loci.values():
+            if not loci:
+                continue
+            chrom = next(iter(loci.values()))[0]
+            positions = [pos for _, pos in loci.values()]
+            self.regions.append((
+                chrom,
+                max(min(positions) - 1 - PGX_REGION_PADDING, 0),
+                max(positions) + PGX_REGION_PADDING
+            ))
+
+    def gene_for_drug(self, drug: str):
+        rule = self.drug_rules.get(drug)
+        return rule["gene"] if rule else None
+
+
+def parse_rule_set(raw: bytes, source: str = None) -> RuleSet:
+    if source and source.endswith((".yaml", ".yml")):
+        # YAML rule sets are optional; importing PyYAML only when used keeps boot fast
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("PyYAML is not installed; use a JSON rule set.")
+        data = yaml.safe_load(raw)
+    else:
+        data = json.loads(raw)
+
+    if not isinstance(data, dict):
+        raise ValueError("Rule set must be a mapping.")
+
+    return RuleSet(data, source)
+
+
+def load_rule_set(path: str = RULES_PATH) -> RuleSet:
+    with open(path, "rb") as handle:
+        return parse_rule_set(handle.read(), path)
+
+
+def diff_rule_sets(old: RuleSet, new: RuleSet):
+    """Return (genes, drugs) whose guideline data differs between two rule sets."""
+
+    genes = set()
+    for section in GENE_SECTIONS:
+        old_section, new_section = old.data[section], new.data[section]
+        for gene in {*old_section, *new_section}:
+            if old_section.get(gene) != new_section.get(gene):
+                genes.add(gene)
+
+    drugs = set()
+    for section in DRUG_SECTIONS:
+        old_section, new_section = old.data[section], new.data[section]
+        for drug in {*old_section, *new_section}:
+            if old_section.get(drug) != new_section.get(drug):
+                drugs.add(drug)
+
+    # A drug is affected when its gene's tables changed too
+    for rule_set in (old, new):
+        for drug, rule in rule_set.drug_rules.items():
+            if rule["gene"] in genes:
+                drugs.add(drug)
+
+    return genes, drugs
+
+
+# ─────────────────────────────────────────────
+# Live Store
+# ─────────────────────────────────────────────
+class RulesStore:
+    """Holds the active RuleSet and swaps it atomically on reload.
+
+    Readers take ``store.current`` once per request and keep using that
+    object, so a swap never mixes two versions within one analysis.
+    Listeners are told which genes and drugs changed so caches can drop
+    only the affected entries.
+    """
+
+    def __init__(self, path: str = RULES_PATH, published_path: str = PUBLISHED_RULES_PATH):
+        self.path = path
+        self.published_path = published_path
+        self._stamp = self._stat()
+        self.current = load_rule_set(self.source())
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def source(self):
+        return self.published_path if os.path.exists(self.published_path) else self.path
+
+    def _stat(self):
+        # Publishing or removing the published file also counts as a change
+        source = self.source()
+        try:
+            return source, os.stat(source).st_mtime_ns
+        except FileNotFoundError:
+            return source, None
+
+    def on_change(self, listener):
+        # listener(old: RuleSet, new: RuleSet, genes: set, drugs: set)
+        self._listeners.append(listener)
+        return listener
+
+    def swap(self, new: RuleSet):
+        with self._lock:
+            old = self.current
+            genes, drugs = diff_rule_sets(old, new)
+            self.current = new
+
+        for listener in self._listeners:
+            listener(old, new, genes, drugs)
+
+        return genes, drugs
+
+    def reload(self):
+        self._stamp = self._stat()
+        new = load_rule_set(self._stamp[0])
+        return self.swap(new)
+
+    def reload_if_changed(self):
+        # Lets every worker process pick up a rule file written by any of them
+        if self._stat() == self._stamp:
+            return None
+        return self.reload()
+
+    def publish(self, raw: bytes, source: str = None):
+        """Validate a new rule set, persist it to ``published_path`` and activate it."""
+
+        new = parse_rule_set(raw, source)
+
+        # A unique temp file per call, so concurrent publishes never interleave
+        directory = os.path.dirname(self.published_path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False
+        ) as handle:
+            json.dump(new.data, handle, indent=2)
+        os.replace(handle.name, self.published_path)
+
+        self._stamp = self._stat()
+        return self.swap(new)
+
+
+rules_store = RulesStore()
+
+
+def current_rules() -> RuleSet:
+    return rules_store.current
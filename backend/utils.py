@@ -0,0 +1,190 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+# ─────────────────────────────────────────────
+# Single-flight request coalescing
+# ─────────────────────────────────────────────
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight call per key between concurrent callers.
+
+    Each caller awaits the shared task through ``asyncio.shield``, so one
+    caller timing out does not cancel it for the others. Once the last
+    caller has gone, the task itself is cancelled instead of left running.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    def in_flight(self, key) -> bool:
+        return key in self._flights
+
+    async def do(self, key, factory):
+        flight = self._flights.get(key)
+
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _forget(self, key, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+# ─────────────────────────────────────────────
+# Bounded worker pool
+# ─────────────────────────────────────────────
+class _WorkerStopped:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException = None):
+        self.error = error
+
+
+_EXHAUSTED = object()
+
+
+async def imap_unordered(func, items, workers: int):
+    """Yield ``await func(item)`` for each item, in completion order.
+
+    ``workers`` coroutines pull from the shared iterator. An item holds one
+    of ``workers`` slots from when it is taken until the caller asks for the
+    next result, so at most ``workers`` items are in progress or buffered at
+    any time, however many there are.
+    """
+
+    items = iter(items)
+    results = asyncio.Queue()
+    slots = asyncio.Semaphore(workers)
+
+    async def worker():
+        try:
+            while True:
+                await slots.acquire()
+                item = next(items, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    slots.release()
+                    break
+                results.put_nowait(await func(item))
+        except Exception as exc:
+            results.put_nowait(_WorkerStopped(exc))
+        else:
+            results.put_nowait(_WorkerStopped())
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(workers)]
+    running = len(tasks)
+
+    try:
+        while running:
+            result = await results.get()
+
+            if isinstance(result, _WorkerStopped):
+                if result.error is not None:
+                    raise result.error
+                running -= 1
+            else:
+                yield result
+                slots.release()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# ─────────────────────────────────────────────
+# Admission control
+# ─────────────────────────────────────────────
+class Overloaded(Exception):
+    """An AdmissionLimiter's wait queue was full or the wait timed out."""
+
+
+class AdmissionLimiter:
+    """A semaphore with a bounded, observable wait queue.
+
+    ``slot()`` admits up to ``limit`` holders. Once ``max_waiting`` callers
+    are already queued, or a caller has waited ``timeout`` seconds, it
+    raises Overloaded instead of queueing, so callers can shed load fast.
+    ``slot(bounded=False)`` waits regardless, for work that is already
+    bounded elsewhere (batch and job workers). ``on_wait(seconds)`` is
+    called with each admitted caller's queue time.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int = None,
+                 timeout: float = None, on_wait=None):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.on_wait = on_wait
+        self._semaphore = asyncio.Semaphore(limit)
+
+        self.in_use = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self, bounded: bool = True):
+        # Count callers still acquiring too, so a burst cannot overshoot
+        queue_full = (
+            self.max_waiting is not None
+            and self.in_use + self.waiting >= self.limit + self.max_waiting
+        )
+        if bounded and queue_full:
+            self.rejected += 1
+            raise Overloaded(f"{self.name} queue is full")
+
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        queued_at = time.perf_counter()
+        try:
+            if bounded and self.timeout is not None:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            else:
+                await self._semaphore.acquire()
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(f"{self.name} queue wait timed out")
+        finally:
+            self.waiting -= 1
+
+        if self.on_wait is not None:
+            self.on_wait(time.perf_counter() - queued_at)
+
+        self.in_use += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_use -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "peak_waiting": self.peak_waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
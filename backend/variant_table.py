@@ -0,0 +1,143 @@
+from array import array
+
+from genotype import ZYGOSITY_LABELS, decode_genotypes
+
+
+# ─────────────────────────────────────────────
+# Columnar Variant Table
+# ─────────────────────────────────────────────
+class VariantTable:
+    """Column-oriented store of parsed variants, grouped by gene.
+
+    Rows are appended while parsing and reordered by gene in ``freeze()``,
+    after which each gene maps to a contiguous row range. Genotypes are kept
+    in one flat row-major list, so a sample's column is a strided slice,
+    and are decoded once into allele/phase/zygosity arrays of the same layout.
+    """
+
+    __slots__ = (
+        "samples", "genes", "gene_code", "chrom", "pos", "rsid", "ref",
+        "alt", "star", "impact", "genotypes", "decoded", "gene_index",
+        "_gene_codes", "_n_columns",
+    )
+
+    def __init__(self, samples=()):
+        self.samples = list(samples)
+        self.genes = []
+        self.gene_code = array("H")
+        self.chrom = []
+        self.pos = array("q")
+        self.rsid = []
+        self.ref = []
+        self.alt = []
+        self.star = []
+        self.impact = []
+        self.genotypes = []
+        self.decoded = None
+        self.gene_index = {}
+        self._gene_codes = {}
+        self._n_columns = len(self.samples)
+
+    def __len__(self):
+        return len(self.pos)
+
+    @property
+    def n_samples(self):
+        return self._n_columns
+
+    def append(self, chrom, pos, rsid, ref, alt, gene, star, impact, genotypes):
+        if not self._n_columns:
+            self._n_columns = len(genotypes)
+
+        code = self._gene_codes.get(gene)
+        if code is None:
+            code = self._gene_codes[gene] = len(self.genes)
+            self.genes.append(gene)
+
+        self.gene_code.append(code)
+        self.chrom.append(chrom)
+        self.pos.append(int(pos))
+        self.rsid.append(rsid)
+        self.ref.append(ref)
+        self.alt.append(alt)
+        self.star.append(star)
+        self.impact.append(impact)
+
+        # Keep the flat genotype list rectangular even for ragged rows
+        n = self._n_columns
+        genotypes = list(genotypes[:n])
+        genotypes.extend(["./."] * (n - len(genotypes)))
+        self.genotypes.extend(genotypes)
+
+    def freeze(self):
+        if not self.samples:
+            # Header-less files: fall back to positional patient IDs
+            self.samples = [
+                f"PATIENT_{i + 1:03d}" for i in range(max(self._n_columns, 1))
+            ]
+
+        order = sorted(range(len(self)), key=self.gene_code.__getitem__)
+
+        if order != list(range(len(self))):
+            self._reorder(order)
+
+        self.gene_index = {}
+        start = 0
+        for row in range(1, len(self) + 1):
+            if row == len(self) or self.gene_code[row] != self.gene_code[start]:
+                self.gene_index[self.genes[self.gene_code[start]]] = range(start, row)
+                start = row
+
+        self.decoded = decode_genotypes(self.genotypes)
+
+        return self
+
+    def _reorder(self, order):
+        for name in ("chrom", "rsid", "ref", "alt", "star", "impact"):
+            column = getattr(self, name)
+            setattr(self, name, [column[i] for i in order])
+
+        self.gene_code = array("H", (self.gene_code[i] for i in order))
+        self.pos = array("q", (self.pos[i] for i in order))
+
+        n = self._n_columns
+        self.genotypes = [
+            gt for i in order for gt in self.genotypes[i * n:(i + 1) * n]
+        ]
+
+    # ── Lookups ──────────────────────────────
+
+    def rows(self, gene: str):
+        return self.gene_index.get(gene, range(0))
+
+    def genotype_column(self, sample_index: int, rows: range = None):
+        n = self._n_columns
+        if rows is None:
+            rows = range(len(self))
+        return self.genotypes[rows.start * n + sample_index:rows.stop * n:n]
+
+    def records(self, gene: str, sample_index: int = 0):
+        """Materialize one gene's rows for a sample as rule-engine dicts."""
+
+        rows = self.rows(gene)
+        n = self._n_columns
+        cells = range(rows.start * n + sample_index, rows.stop * n, n)
+        zygosity = self.decoded.zygosity
+        phased = self.decoded.phased
+
+        return [
+            {
+                "chrom": self.chrom[row],
+                "pos": str(self.pos[row]),
+                "rsid": self.rsid[row],
+                "ref": self.ref[row],
+                "alt": self.alt[row],
+                "gene": gene,
+                "star": self.star[row],
+                "impact": self.impact[row],
+                "genotype": self.genotypes[cell],
+                "zygosity": ZYGOSITY_LABELS[zygosity[cell]],
+                "phased": bool(phased[cell])
+            }
+            for row, cell in zip(rows, cells)
+        ]
@@ -1,3 +1,31 @@
+from bgzf import GzipStreamDecoder, iter_regions
+from rules_store import current_rules
+from variant_table import VariantTable
+
+
+def is_target(chrom: str, pos: str, rsid: str, rest: str = "", rules=None):
+    # rsIDs + loci the rule engine acts on, or a record annotated with a panel gene
+    rules = rules or current_rules()
+    return (
+        rsid in rules.target_rsids
+        or (chrom, pos) in rules.target_loci
+        or ("GENE=" in rest and annotated_gene(rest) in rules.target_genes)
+    )
+
+
+def annotated_gene(rest):
+    # ``rest`` is the line after CHROM/POS/ID, so INFO is its fifth column
+    columns = rest.split(None, 5)
+    if len(columns) < 5:
+        return None
+
+    key, separator = ("GENE=", ";") if isinstance(rest, str) else (b"GENE=", b";")
+    for item in columns[4].split(separator):
+        if item.startswith(key):
+            return item[len(key):]
+    return None
+
+
 def parse_info_field(info_string: str):
     info_dict = {}
     items = info_string.split(";")
@@ -10,39 +38,183 @@ def parse_info_field(info_string: str):
     return info_dict
 
 
-def parse_vcf(file_content: str):
-    parsed_variants = []
+def iter_vcf_rows(lines, pgx_only: bool = False):
 
-    for line in file_content.splitlines():
+    for line in lines:
 
-        if not line.strip() or line.startswith("#"):
+        if line.startswith("#"):
             continue
 
+        # Cheap prefix check on CHROM/POS/ID before splitting the whole line
+        if pgx_only:
+            prefix = line.split(None, 3)
+            if len(prefix) < 4 or not is_target(*prefix):
+                continue
+
         columns = line.strip().split()
 
         if len(columns) < 10:
             continue
 
-        chrom = columns[0]
-        pos = columns[1]
-        rsid = columns[2]
-        ref = columns[3]
-        alt = columns[4]
-        info_field = columns[7]
-        genotype = columns[9]
+        info_data = parse_info_field(columns[7])
+
+        # chrom, pos, rsid, ref, alt, gene, star, impact, genotypes
+        yield (
+            columns[0],
+            columns[1],
+            columns[2],
+            columns[3],
+            columns[4],
+            info_data.get("GENE"),
+            info_data.get("STAR"),
+            info_data.get("IMPACT", "Unknown"),
+            columns[9:]
+        )
 
-        info_data = parse_info_field(info_field)
 
-        parsed_variants.append({
+def iter_vcf(lines, pgx_only: bool = False):
+
+    for chrom, pos, rsid, ref, alt, gene, star, impact, genotypes in iter_vcf_rows(
+        lines, pgx_only
+    ):
+        yield {
             "chrom": chrom,
             "pos": pos,
             "rsid": rsid,
             "ref": ref,
             "alt": alt,
-            "gene": info_data.get("GENE"),
-            "star": info_data.get("STAR"),
-            "impact": info_data.get("IMPACT", "Unknown"),
-            "genotype": genotype
-        })
+            "gene": gene,
+            "star": star,
+            "impact": impact,
+            "genotype": genotypes[0],
+            "genotypes": genotypes
+        }
+
+
+def parse_vcf(file_content: str):
+    return list(iter_vcf(file_content.splitlines()))
+
+
+def parse_sample_names(header_line: str):
+    return header_line.strip().split()[9:]
+
+
+# ─────────────────────────────────────────────
+# Incremental (chunked) parsing
+# ─────────────────────────────────────────────
+class VCFStreamParser:
+    """Push parser fed with raw byte chunks of an upload.
+
+    Only the trailing partial line is buffered between chunks, and only
+    PGx-relevant records are retained, so memory does not grow with file size.
+    Irrelevant lines are rejected on their raw bytes, before any decoding.
+    Every sample column is kept, so a cohort file is scanned exactly once.
+    Records go straight into a columnar VariantTable.
+    """
+
+    def __init__(self, pgx_only: bool = True, rules=None):
+        self.pgx_only = pgx_only
+        # Pinned for the whole file so a rules reload cannot change the filter mid-parse
+        self.rules = rules or current_rules()
+        self.table = VariantTable()
+        self._remainder = b""
+
+    def feed(self, chunk: bytes):
+        data = self._remainder + chunk
+        cut = data.rfind(b"\n") + 1
+        self._remainder = data[cut:]
+        self._consume(data[:cut])
+
+    def close(self):
+        if self._remainder:
+            self._consume(self._remainder)
+            self._remainder = b""
+        return self.table.freeze()
+
+    def _consume(self, block: bytes):
+        # The #CHROM header precedes all records
+        if not self.table.samples and not len(self.table):
+            self._read_samples(block)
+
+        raw_lines = block.split(b"\n")
+
+        if self.pgx_only:
+            loci = block_target_loci(
+                block, self.rules.target_loci_bytes, self.rules.target_genes_bytes
+            )
+            raw_lines = filter_target_lines(raw_lines, self.rules.target_rsids_bytes, loci)
+
+        decoded = (raw.decode("utf-8") for raw in raw_lines)
+
+        for row in iter_vcf_rows(decoded):
+            self.table.append(*row)
+
+    def _read_samples(self, block: bytes):
+        start = block.find(b"#CHROM")
+        if start == -1:
+            return
+
+        end = block.find(b"\n", start)
+        header_line = block[start:] if end == -1 else block[start:end]
+        self.table = VariantTable(parse_sample_names(header_line.decode("utf-8")))
+
+
+def filter_target_lines(raw_lines, rsids: frozenset, loci: frozenset):
+    # Only CHROM/POS/ID are split off; header lines never match either set
+    return [
+        raw for raw in raw_lines
+        if len(prefix := raw.split(None, 3)) == 4
+        and (prefix[2] in rsids or (prefix[0], prefix[1]) in loci)
+    ]
+
+
+def block_target_loci(block: bytes, loci: frozenset, genes: frozenset):
+    """``loci`` plus the positions of records in ``block`` annotated with a panel gene.
+
+    GENE= annotations are found with one scan of the whole block, so records
+    without one pay nothing extra in filter_target_lines.
+    """
+
+    annotated = set()
+    hit = block.find(b"GENE=")
+
+    while hit != -1:
+        start = block.rfind(b"\n", 0, hit) + 1
+        end = block.find(b"\n", hit)
+        end = len(block) if end == -1 else end
+
+        prefix = block[start:end].split(None, 3)
+        if len(prefix) == 4 and annotated_gene(prefix[3]) in genes:
+            annotated.add((prefix[0], prefix[1]))
+
+        hit = block.find(b"GENE=", end)
+
+    return loci | annotated if annotated else loci
+
+
+def parse_vcf_fileobj(fileobj, compressed: bool = False, pgx_only: bool = True,
+                      rules=None, chunk_size: int = 1024 * 1024):
+    """Stream a plain or gzip/BGZF file object through VCFStreamParser."""
+
+    parser = VCFStreamParser(pgx_only, rules)
+    decoder = GzipStreamDecoder() if compressed else None
+
+    while chunk := fileobj.read(chunk_size):
+        for piece in decoder.decompress(chunk) if decoder else (chunk,):
+            parser.feed(piece)
+
+    if decoder:
+        decoder.close()
+
+    return parser.close()
+
+
+def parse_indexed_vcf(fileobj, index, pgx_only: bool = True, rules=None):
+    """Parse only the pharmacogene regions of a bgzipped VCF using its index."""
+
+    parser = VCFStreamParser(pgx_only, rules)
+
+    for blob in iter_regions(fileobj, index, parser.rules.regions):
+        parser.feed(blob)
 
-    return parsed_variants
+    return parser.close()
@@ -7,7 +7,7 @@ import AnalyzeButton from './components/AnalyzeButton';
 import ResultsDashboard from './components/ResultsDashboard';
 import LoadingOverlay from './components/LoadingOverlay';
 import GlassCard from './components/GlassCard';
-import { analyzeVCF, SAMPLE_VCF } from './services/pgxService';
+import { analyzeVCFStream, SAMPLE_VCF } from './services/pgxService';
 import type { AnalysisResult } from './types';
 import './index.css';
 
@@ -99,10 +99,28 @@ const App: React.FC = () => {
     setIsAnalyzing(true);
     startLoadingAnim();
 
+    setResults([]);
+    setActiveTab(0);
+
     try {
-      const newResults = await analyzeVCF(vcfContent, vcfFileName || 'data.vcf', selectedDrugs);
+      // Show each drug as soon as its rules result arrives; mechanisms fill in later
+      const newResults = await analyzeVCFStream(vcfContent, vcfFileName || 'data.vcf', selectedDrugs, {
+        onResult: (index, result) => {
+          setIsAnalyzing(false);
+          setResults(prev => {
+            const next = [...prev];
+            next[index] = result;
+            return next;
+          });
+        },
+        onMechanism: (indices, mechanism) => {
+          setResults(prev => prev.map((result, i) => indices.includes(i)
+            ? { ...result, llm_explanation: { ...result.llm_explanation, biological_mechanism: mechanism } }
+            : result
+          ));
+        }
+      });
       setResults(newResults);
-      setActiveTab(0);
       showToast('Analysis complete!', '✅');
     } catch (e: any) {
       showToast(e.message || 'Analysis failed', '❌');
@@ -32,7 +32,9 @@ const ExplanationBlock: React.FC<ExplanationBlockProps> = ({ explanation }) => {
 
       <div className="bio-section">
         <div className="bio-title">BIOLOGICAL MECHANISM</div>
-        <div className="bio-text">{explanation.biological_mechanism}</div>
+        <div className="bio-text">
+          {explanation.biological_mechanism ?? 'Generating explanation…'}
+        </div>
       </div>
 
       <div className="bio-section">
@@ -46,10 +46,18 @@ async function fetchWithRetry(
   }
 }
 
-export async function analyzeVCF(
+export interface StreamHandlers {
+  onResult?: (index: number, result: AnalysisResult) => void;
+  onMechanism?: (indices: number[], mechanism: string | null) => void;
+}
+
+// Consumes /analyze/stream: each drug's deterministic result arrives as
+// soon as it is computed, and its biological mechanism follows separately.
+export async function analyzeVCFStream(
   vcfContent: string,
   vcfFileName: string,
-  drugs: string[]
+  drugs: string[],
+  handlers: StreamHandlers = {}
 ): Promise<AnalysisResult[]> {
 
   if (isAnalyzing) {
@@ -58,7 +66,6 @@ export async function analyzeVCF(
 
   isAnalyzing = true;
 
-  // Cancel previous request if exists
   if (currentController) {
     currentController.abort();
   }
@@ -71,9 +78,32 @@ export async function analyzeVCF(
   formData.append('file', file);
   formData.append('drugs', drugs.join(','));
 
+  const results: AnalysisResult[] = [];
+
+  const handleEvent = (event: any) => {
+    switch (event.event) {
+      case 'result':
+        results[event.index] = event.result;
+        handlers.onResult?.(event.index, event.result);
+        break;
+      case 'mechanism':
+        for (const index of event.indices) {
+          const result = results[index];
+          results[index] = {
+            ...result,
+            llm_explanation: { ...result.llm_explanation, biological_mechanism: event.biological_mechanism }
+          };
+        }
+        handlers.onMechanism?.(event.indices, event.biological_mechanism);
+        break;
+      case 'error':
+        throw new Error(event.detail || 'Explanation generation failed.');
+    }
+  };
+
   try {
     const response = await fetchWithRetry(
-      `${API_URL}/analyze`,
+      `${API_URL}/analyze/stream`,
       {
         method: 'POST',
         body: formData,
@@ -82,7 +112,7 @@ export async function analyzeVCF(
       2
     );
 
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       const errorData = await response
         .json()
         .catch(() => ({ detail: 'Network error' }));
@@ -93,8 +123,26 @@ export async function analyzeVCF(
       );
     }
 
-    const data = await response.json();
-    return data.results;
+    // NDJSON: one event per line, possibly split across chunks
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value, { stream: !done });
+
+      const lines = buffer.split('\n');
+      buffer = lines.pop() ?? '';
+
+      for (const line of lines) {
+        if (line.trim()) handleEvent(JSON.parse(line));
+      }
+
+      if (done) break;
+    }
+
+    return results;
 
   } catch (error: any) {
 
@@ -109,4 +157,4 @@ export async function analyzeVCF(
   } finally {
     isAnalyzing = false;
   }
-}
\ No newline at end of file
+}
@@ -44,7 +44,7 @@ export interface ClinicalRecommendation {
 
 export interface LLMExplanation {
   summary:              string;
-  biological_mechanism: string;
+  biological_mechanism: string | null;  // null until streamed in
   variant_impact:       string;
   clinical_context:     string;
   evidence_level:       string;